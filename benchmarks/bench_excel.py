@@ -0,0 +1,89 @@
+"""Сравнение построчной и векторной обработки Excel на 100 000 строк
+
+Запуск из корня проекта: python -m benchmarks.bench_excel [число строк]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import pandas as pd
+from utils.excel import export_to_excel, import_from_excel
+
+ROWS = 100_000
+
+
+def legacy_export(data, filepath):
+    df = pd.DataFrame(data)
+    with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Данные')
+        worksheet = writer.sheets['Данные']
+        workbook = writer.book
+        header_format = workbook.add_format({'bold': True, 'border': 1})
+        data_format = workbook.add_format({'border': 1})
+        number_format = workbook.add_format({'border': 1, 'num_format': '0.00'})
+        for col_num, value in enumerate(df.columns.values):
+            worksheet.write(0, col_num, value, header_format)
+        for row_num in range(len(df)):
+            worksheet.write(row_num + 1, 0, df.iloc[row_num, 0], data_format)
+            temp_value = df.iloc[row_num, 1]
+            if pd.isna(temp_value):
+                worksheet.write(row_num + 1, 1, '', data_format)
+            else:
+                worksheet.write(row_num + 1, 1, temp_value, number_format)
+
+
+def legacy_import(filename):
+    df = pd.read_excel(filename)
+    data = []
+    for _, row in df.iterrows():
+        try:
+            temp = float(row['Температура'])
+            if -99.99 <= temp <= 99.99:
+                data.append({'src': row['Источник'], 'tcw': temp})
+        except (ValueError, TypeError):
+            continue
+    return data
+
+
+def make_data(rows: int):
+    random.seed(1)
+    return [
+        {
+            'Источник': f"Котельная №{i}",
+            'Температура': None if i % 50 == 0 else round(random.uniform(-5, 120), 2)
+        }
+        for i in range(rows)
+    ]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    data = make_data(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.xlsx")
+        path = os.path.join(tmp, "vectorized.xlsx")
+
+        legacy_export_time, _ = timed(legacy_export, data, legacy_path)
+        export_time, _ = timed(export_to_excel, data, path)
+        legacy_import_time, expected = timed(legacy_import, path)
+        import_time, result = timed(import_from_excel, path)
+        assert result == expected
+
+    print(f"строк: {rows}")
+    print(f"{'операция':<10} {'построчно, с':>13} {'векторно, с':>12} {'ускорение':>10}")
+    for name, legacy, vectorized in (
+        ("экспорт", legacy_export_time, export_time),
+        ("импорт", legacy_import_time, import_time),
+    ):
+        print(f"{name:<10} {legacy:>13.2f} {vectorized:>12.2f} {legacy / vectorized:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
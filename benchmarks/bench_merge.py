@@ -0,0 +1,56 @@
+"""Сравнение вложенного цикла и индекса SourceIndex при сопоставлении данных
+
+Запуск из корня проекта: python -m benchmarks.bench_merge
+"""
+import random
+import timeit
+from core.merge import SourceIndex
+from core.model import SourceNode
+
+SIZES = [(1_000, 100), (5_000, 300), (20_000, 1_000)]
+
+
+def nested_loop_merge(node_data, temp_data):
+    return [
+        {"nodeid": item1.nodeid, "tcw": item2["tcw"]}
+        for item1 in node_data
+        for item2 in temp_data
+        if item1.src == item2["src"]
+    ]
+
+
+def make_data(nodes: int, sources: int):
+    names = [f"Котельная №{i}" for i in range(sources)]
+    node_data = [
+        SourceNode(random.choice(names), i)
+        for i in range(nodes)
+    ]
+    temp_data = [
+        {"src": name, "tcw": round(random.uniform(2, 15), 2)}
+        for name in names
+    ]
+    return node_data, temp_data
+
+
+def measure(func, repeat: int = 3) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    random.seed(1)
+    print(f"{'узлы':>8} {'источники':>10} {'цикл, мс':>10} {'индекс, мс':>11} {'ускорение':>10}")
+    for nodes, sources in SIZES:
+        node_data, temp_data = make_data(nodes, sources)
+        assert len(nested_loop_merge(node_data, temp_data)) == len(
+            SourceIndex(node_data).merge(temp_data).items)
+
+        loop_time = measure(lambda: nested_loop_merge(node_data, temp_data))
+        index_time = measure(lambda: SourceIndex(node_data).merge(temp_data))
+        print(
+            f"{nodes:>8} {sources:>10} {loop_time * 1000:>10.1f} "
+            f"{index_time * 1000:>11.1f} {loop_time / index_time:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Сквозной нагрузочный замер: вход, загрузка объектов учёта и запись Тхв
+
+Заглушка сервера запускается отдельным процессом, чтобы её работа не
+попадала в замеры клиента. Запуск из корня проекта:
+    python -m benchmarks.bench_pipeline --sizes 100 10000 100000 --latency 0.002
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from benchmarks.mock_server import STATS_ENDPOINT
+from core.api import ApiManager
+from core.auth import AuthManager
+from core.cache import NodeCache
+from core.journal import PushJournal
+from core.outbox import PushOutbox
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+BENCH_PAGE_SIZE = 1000  # размер страницы при --paging
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def start_server(nodes: int, args: argparse.Namespace):
+    command = [
+        sys.executable, "-m", "benchmarks.mock_server",
+        "--port", "0",
+        "--nodes", str(nodes),
+        "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate),
+        "--throttle-rate", str(args.throttle_rate),
+        "--token-ttl", str(args.token_ttl)
+    ]
+    if args.bulk:
+        command.append("--bulk")
+    if args.paging:
+        command += ["--paging", "--unnamed", str(args.unnamed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url:
+        process.kill()
+        raise RuntimeError("Заглушка сервера не запустилась")
+    return process, url
+
+
+async def run_size(nodes: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    process, url = start_server(nodes, args)
+    auth_manager = AuthManager()
+    auth_manager.server = url
+    auth_manager.login = "bench"
+    auth_manager.password = "bench"
+    api_manager = ApiManager(
+        auth_manager,
+        journal=PushJournal(os.path.join(workdir, f"journal_{nodes}.json")),
+        node_cache=NodeCache(path=None),
+        outbox=PushOutbox(os.path.join(workdir, f"outbox_{nodes}.json"))
+    )
+    if args.paging:
+        api_manager.page_size = BENCH_PAGE_SIZE
+    try:
+        tracemalloc.start()
+        started = time.perf_counter()
+        names = await api_manager.get_sources_names(force_refresh=True)
+        refresh_time = time.perf_counter() - started
+        refresh_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        temp_data = [
+            {"src": name, "tcw": round(random.uniform(2, 15), 2)}
+            for name in names
+        ]
+        plan = await api_manager.plan_push(temp_data, skip_unchanged=False)
+
+        started = time.perf_counter()
+        report = await api_manager.push_temperature_data(plan.items)
+        push_time = time.perf_counter() - started
+
+        session = await api_manager.get_session()
+        async with session.get(f"{url}{STATS_ENDPOINT}") as response:
+            stats = json.loads(await response.read())
+
+        latencies = [r.latency for r in report.results if not r.skipped]
+        return {
+            "nodes": nodes,
+            "refresh_s": refresh_time,
+            "refresh_peak_mb": refresh_peak / 1024 / 1024,
+            "push_s": push_time,
+            "throughput": len(plan.items) / push_time if push_time else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "failed": len(report.failed),
+            "server": stats
+        }
+    finally:
+        await auth_manager.close_session()
+        process.terminate()
+        process.wait()
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    print(
+        f"{'узлы':>8} {'загрузка, с':>12} {'пик, МБ':>8} {'запись, с':>10} "
+        f"{'узлов/с':>9} {'p50, мс':>8} {'p99, мс':>8} {'ошибок':>7} "
+        f"{'входов':>7} {'соединений':>11}"
+    )
+    for row in rows:
+        print(
+            f"{row['nodes']:>8} {row['refresh_s']:>12.2f} {row['refresh_peak_mb']:>8.1f} "
+            f"{row['push_s']:>10.2f} {row['throughput']:>9.0f} {row['p50_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['failed']:>7} "
+            f"{row['server']['logins']:>7} {row['server']['connections']:>11}"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Нагрузочный замер загрузки и записи")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка сервера, с")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=3600)
+    parser.add_argument("--bulk", action="store_true", help="сервер с пакетной записью")
+    parser.add_argument("--paging", action="store_true", help="сервер с постраничной загрузкой")
+    parser.add_argument("--unnamed", type=int, default=0,
+                        help="объектов учёта без sourceName при --paging")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    return parser
+
+
+async def main(args: argparse.Namespace):
+    random.seed(1)
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for nodes in args.sizes:
+            rows.append(await run_size(nodes, args, workdir))
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
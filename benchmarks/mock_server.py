@@ -0,0 +1,281 @@
+"""Локальная замена API ЛЭРС УЧЁТ для нагрузочных замеров
+
+Запуск из корня проекта:
+    python -m benchmarks.mock_server --nodes 10000 --latency 0.005 --port 8765
+
+Поддерживает /api/v1/Login, /api/v1/Core/Nodes (с ETag, а с --paging ещё
+отбор по attributeCode и страницы skip/take) и PATCH объектов учёта.
+Задержка, доля ошибок, ответы 429 и срок жизни ключа настраиваются.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+from aiohttp import web
+from config.settings import (
+    API_LOGIN_ENDPOINT,
+    API_NODES_ENDPOINT,
+    API_NODES_BULK_ENDPOINT
+)
+
+STATS_ENDPOINT = "/_stats"
+
+
+class MockLersServer:
+    """Заглушка сервера ЛЭРС УЧЁТ на aiohttp"""
+
+    def __init__(
+        self,
+        nodes: int = 100,
+        sources: Optional[int] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.5,
+        token_ttl: float = 3600,
+        bulk: bool = False,
+        paging: bool = False,
+        page_limit: Optional[int] = None,
+        unnamed: int = 0,
+        seed: int = 1
+    ):
+        self.nodes = nodes
+        self.sources = sources or max(1, nodes // 10)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.bulk = bulk
+        self.paging = paging
+        # Наибольший take, остальное сервер отбрасывает молча
+        self.page_limit = page_limit
+        # Объекты учёта без sourceName, которые отбор на сервере отбрасывает
+        self.unnamed = unnamed
+        self.random = random.Random(seed)
+        self.values: Dict[int, float] = {i: 5.0 for i in range(nodes + unnamed)}
+        self.tokens: Dict[str, float] = {}
+        self.stats = {"logins": 0, "nodes": 0, "pages": 0, "patches": 0, "bulk": 0,
+                      "errors": 0, "throttled": 0, "unauthorized": 0}
+        self._connections = set()
+        self._nodes: Optional[List[dict]] = None
+        self._payload: Optional[bytes] = None
+        self._etag = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    def source_name(self, node_id: int) -> str:
+        return f"Котельная №{node_id % self.sources}"
+
+    def _node(self, i: int) -> dict:
+        attributes = [{"code": "inventoryNumber", "value": f"INV-{i:06d}", "nodeId": i}]
+        if i < self.nodes:
+            attributes.insert(
+                0, {"code": "sourceName", "value": self.source_name(i), "nodeId": i})
+        return {
+            "id": i,
+            "title": f"Объект учёта {i}",
+            "address": f"ул. Тестовая, д. {i}",
+            "coldWaterSummerTemp": self.values[i],
+            "coldWaterWinterTemp": self.values[i],
+            "attributes": attributes
+        }
+
+    def _node_list(self) -> List[dict]:
+        if self._nodes is None:
+            self._nodes = [self._node(i) for i in range(self.nodes + self.unnamed)]
+        return self._nodes
+
+    def _build_payload(self) -> bytes:
+        if self._payload is None:
+            self._payload = json.dumps({"nodes": self._node_list()}, ensure_ascii=False).encode()
+            self._etag = f'"{uuid.uuid4().hex}"'
+        return self._payload
+
+    def _invalidate_payload(self):
+        self._nodes = None
+        self._payload = None
+
+    def _page(self, request: web.Request) -> web.Response:
+        """Отбор по коду атрибута и страница skip/take"""
+        nodes = self._node_list()
+        code = request.query.get("attributeCode")
+        if code:
+            nodes = [
+                node for node in nodes
+                if any(attribute["code"] == code for attribute in node["attributes"])
+            ]
+        skip = int(request.query.get("skip", 0))
+        take = int(request.query.get("take", len(nodes)))
+        if self.page_limit:
+            take = min(take, self.page_limit)
+        self.stats["pages"] += 1
+        body = json.dumps({"nodes": nodes[skip:skip + take]}, ensure_ascii=False).encode()
+        return web.Response(
+            body=body,
+            content_type="application/json",
+            headers={"X-Total-Count": str(len(nodes))}
+        )
+
+    async def _simulate(self, request: web.Request) -> Optional[web.Response]:
+        """Задержка, проверка ключа, 429 и случайные ошибки"""
+        self._connections.add(id(request.transport))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        token = request.headers.get("Authorization", "")[len("Bearer "):]
+        issued = self.tokens.get(token)
+        if issued is None or time.monotonic() - issued > self.token_ttl:
+            self.stats["unauthorized"] += 1
+            return web.Response(status=401)
+        if self.throttle_rate and self.random.random() < self.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)})
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=503)
+        return None
+
+    async def login(self, request: web.Request) -> web.Response:
+        self._connections.add(id(request.transport))
+        await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.stats["logins"] += 1
+        token = uuid.uuid4().hex
+        self.tokens[token] = time.monotonic()
+        return web.json_response({"token": token})
+
+    async def get_nodes(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+        self.stats["nodes"] += 1
+        if self.paging and ("take" in request.query or "attributeCode" in request.query):
+            return self._page(request)
+        payload = self._build_payload()
+        if request.headers.get("If-None-Match") == self._etag:
+            return web.Response(status=304)
+        return web.Response(
+            body=payload,
+            content_type="application/json",
+            headers={"ETag": self._etag}
+        )
+
+    async def patch_node(self, request: web.Request) -> web.Response:
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+        node_id = int(request.match_info["node_id"])
+        if node_id not in self.values:
+            return web.Response(status=404)
+        self.stats["patches"] += 1
+        for operation in await request.json():
+            if operation["path"] == "coldWaterSummerTemp":
+                self.values[node_id] = operation["value"]
+        self._invalidate_payload()
+        return web.Response(status=204)
+
+    async def bulk_options(self, request: web.Request) -> web.Response:
+        if not self.bulk:
+            return web.Response(status=404)
+        return web.Response(headers={"Allow": "PATCH, OPTIONS"})
+
+    async def bulk_patch(self, request: web.Request) -> web.Response:
+        if not self.bulk:
+            return web.Response(status=404)
+        failure = await self._simulate(request)
+        if failure is not None:
+            return failure
+        self.stats["bulk"] += 1
+        results = []
+        for entry in await request.json():
+            node_id = int(entry["id"])
+            if node_id not in self.values:
+                results.append({"id": entry["id"], "status": 404})
+                continue
+            self.stats["patches"] += 1
+            for operation in entry["patch"]:
+                if operation["path"] == "coldWaterSummerTemp":
+                    self.values[node_id] = operation["value"]
+            results.append({"id": entry["id"], "status": 200})
+        self._invalidate_payload()
+        return web.json_response({"results": results})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "connections": len(self._connections)})
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post(API_LOGIN_ENDPOINT, self.login)
+        app.router.add_get(API_NODES_ENDPOINT, self.get_nodes)
+        if API_NODES_BULK_ENDPOINT:
+            app.router.add_route("OPTIONS", API_NODES_BULK_ENDPOINT, self.bulk_options)
+            app.router.add_patch(API_NODES_BULK_ENDPOINT, self.bulk_patch)
+        app.router.add_patch(f"{API_NODES_ENDPOINT}/{{node_id}}", self.patch_node)
+        app.router.add_get(STATS_ENDPOINT, self.get_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запуск сервера, возвращает его адрес"""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Заглушка API ЛЭРС УЧЁТ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--nodes", type=int, default=100, help="число объектов учёта")
+    parser.add_argument("--sources", type=int, help="число источников (по умолчанию nodes / 10)")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After для 429, с")
+    parser.add_argument("--token-ttl", type=float, default=3600, help="срок жизни ключа, с")
+    parser.add_argument("--bulk", action="store_true", help="поддерживать пакетную запись")
+    parser.add_argument("--paging", action="store_true",
+                        help="поддерживать отбор и постраничную загрузку объектов учёта")
+    parser.add_argument("--page-limit", type=int, help="наибольший размер страницы при --paging")
+    parser.add_argument("--unnamed", type=int, default=0,
+                        help="число объектов учёта без атрибута sourceName")
+    return parser
+
+
+async def serve(args: argparse.Namespace):
+    server = MockLersServer(
+        nodes=args.nodes,
+        sources=args.sources,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        token_ttl=args.token_ttl,
+        bulk=args.bulk,
+        paging=args.paging,
+        page_limit=args.page_limit,
+        unnamed=args.unnamed
+    )
+    url = await server.start(args.host, args.port)
+    print(url, flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(build_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1 @@
+"""Пакет консольного интерфейса приложения"""
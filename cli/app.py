@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import os
+import sys
+from typing import List, Optional, Union
+from core.auth import AuthManager
+from core.api import ApiManager
+from core.merge import MergeResult
+from core.profiles import ServerProfile
+from core.push import PushReport
+from core.model import PushItem
+from core.servers import ServerGroup
+from utils import metrics
+from utils.excel import read_records
+
+# Коды завершения
+EXIT_OK = 0
+EXIT_PUSH_FAILED = 1
+EXIT_ERROR = 2
+
+PASSWORD_ENV = "TCWIMPORT_PASSWORD"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="tcwimport",
+        description="Импорт температуры холодной воды в ЛЭРС УЧЁТ без графического интерфейса"
+    )
+    parser.add_argument("--server", help="адрес сервера (по умолчанию из credentials.txt)")
+    parser.add_argument("--login", help="логин (по умолчанию из credentials.txt)")
+    parser.add_argument(
+        "--password",
+        help=f"пароль (по умолчанию из переменной {PASSWORD_ENV} или credentials.txt)"
+    )
+    parser.add_argument(
+        "--profile", action="append", metavar="NAME",
+        help="работать только с указанным сервером (можно повторять); "
+             "по умолчанию - со всеми сохранёнными"
+    )
+    parser.add_argument(
+        metrics.METRICS_FLAG, dest="metrics", metavar="FILE",
+        help="писать замеры времени этапов в файл строками JSON"
+    )
+    parser.add_argument(
+        metrics.TIMINGS_FLAG, dest="timings", action="store_true",
+        help="вывести в stderr сводную таблицу замеров"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    push = commands.add_parser("push", help="записать температуры из файла Excel")
+    push.add_argument(
+        "file",
+        help="файл .xlsx, .csv или .parquet со столбцами 'Источник' и 'Температура'"
+    )
+    push.add_argument("-q", "--quiet", action="store_true", help="не выводить отчёт по объектам")
+    push.add_argument(
+        "-n", "--dry-run", action="store_true",
+        help="только показать, какие значения изменятся, без записи"
+    )
+    push.add_argument(
+        "--all", action="store_true",
+        help="записать и объекты, где значение уже совпадает"
+    )
+
+    commands.add_parser("sources", help="вывести список источников на сервере")
+
+    profiles = commands.add_parser("profiles", help="дополнительные серверы")
+    actions = profiles.add_subparsers(dest="action")
+    actions.add_parser("list", help="вывести сохранённые серверы")
+    add = actions.add_parser("add", help="добавить или заменить сервер")
+    add.add_argument("name", help="имя сервера в отчётах")
+    add.add_argument("--server", dest="profile_server", required=True, help="адрес сервера")
+    add.add_argument("--login", dest="profile_login", required=True, help="логин")
+    add.add_argument(
+        "--password", dest="profile_password",
+        help=f"пароль (по умолчанию из переменной {PASSWORD_ENV})"
+    )
+    remove = actions.add_parser("remove", help="удалить сервер")
+    remove.add_argument("name")
+    return parser
+
+
+def configure_auth(auth_manager: AuthManager, args: argparse.Namespace) -> bool:
+    """Учётные данные: аргументы и окружение переопределяют сохранённые"""
+    auth_manager.load_credentials()
+    if args.server:
+        # Явно указанный сервер - работа только с ним
+        auth_manager.profiles = []
+    auth_manager.server = args.server or auth_manager.server
+    auth_manager.login = args.login or auth_manager.login
+    auth_manager.password = (
+        args.password or os.environ.get(PASSWORD_ENV) or auth_manager.password)
+    return bool(auth_manager.server and auth_manager.login)
+
+
+def select_servers(
+    primary: ApiManager,
+    names: Optional[List[str]]
+) -> Union[ApiManager, ServerGroup, None]:
+    """Один сервер или группа из сохранённых профилей"""
+    if not primary.auth_manager.profiles:
+        return primary if not names or primary.auth_manager.server in names else None
+    group = ServerGroup.from_auth(primary)
+    if names:
+        group.managers = {
+            name: api_manager for name, api_manager in group.managers.items()
+            if name in names
+        }
+    if not group.managers:
+        return None
+    if len(group.managers) == 1:
+        return next(iter(group.managers.values()))
+    return group
+
+
+def item_line(item: PushItem, status: str) -> str:
+    line = f"{item.nodeid}\t{item.src}\t{item.tcw}\t{status}"
+    if item.profile is not None:
+        line = f"{item.profile}\t{line}"
+    return line
+
+
+def print_servers(plan: MergeResult, report: Optional[PushReport] = None):
+    """Итог по каждому серверу при записи на несколько серверов"""
+    for name, server_plan in getattr(plan, "servers", {}).items():
+        if server_plan is None:
+            print(f"{name}: не удалось получить объекты учёта", file=sys.stderr)
+            continue
+        server_report = getattr(report, "servers", {}).get(name)
+        if server_report is None:
+            print(f"{name}: будет записано {len(server_plan.items)}, "
+                  f"без изменений {len(server_plan.unchanged)}", file=sys.stderr)
+        else:
+            print(f"{name}: записано {len(server_report.succeeded)}, "
+                  f"ошибок {len(server_report.failed)}", file=sys.stderr)
+
+
+def print_plan(plan: MergeResult, quiet: bool):
+    if not quiet:
+        for item in plan.items:
+            print(item_line(item, "будет записано"))
+    print_servers(plan)
+    for src in plan.unmatched_sources:
+        print(f"Источник не найден на сервере: {src}", file=sys.stderr)
+    print(
+        f"Будет записано: {len(plan.items)}, без изменений: {len(plan.unchanged)}, "
+        f"источников без объектов: {len(plan.unmatched_sources)}",
+        file=sys.stderr
+    )
+
+
+def print_report(report: PushReport, plan: MergeResult, quiet: bool):
+    if not quiet:
+        for result in report.results:
+            item = result.item
+            if result.skipped:
+                status = "записано ранее"
+            elif result.success:
+                status = "ok"
+            else:
+                status = f"ошибка {result.status or ''} {result.error or ''}".strip()
+            print(item_line(item, status))
+    print_servers(plan, report)
+    for src in plan.unmatched_sources:
+        print(f"Источник не найден на сервере: {src}", file=sys.stderr)
+    print(
+        f"Записано: {len(report.succeeded)}, ошибок: {len(report.failed)}, "
+        f"без изменений: {len(plan.unchanged)}, "
+        f"источников без объектов: {len(plan.unmatched_sources)}",
+        file=sys.stderr
+    )
+
+
+async def push(api_manager: Union[ApiManager, ServerGroup], args: argparse.Namespace) -> int:
+    try:
+        # Файл только открывается и проверяется, строки читает сопоставление
+        with metrics.span("excel.open"):
+            temp_data = read_records(args.file)
+        plan = await api_manager.plan_push(temp_data, skip_unchanged=not args.all)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return EXIT_ERROR
+
+    if plan is None:
+        print("Не удалось получить объекты учёта с сервера", file=sys.stderr)
+        return EXIT_ERROR
+    warn_offline(api_manager)
+
+    # Недоступный сервер из группы - запись выполнена не полностью
+    complete = None not in getattr(plan, "servers", {}).values()
+
+    if args.dry_run:
+        print_plan(plan, args.quiet)
+        return EXIT_OK if complete else EXIT_PUSH_FAILED
+
+    report = await api_manager.push_temperature_data(plan.items)
+    print_report(report, plan, args.quiet)
+    if report.queued:
+        print(
+            f"Сервер недоступен, поставлено в очередь: {len(report.queued)}; "
+            "значения будут записаны следующим запуском",
+            file=sys.stderr
+        )
+    # Значения, оставшиеся в очереди после прошлых запусков
+    flushed = None if report.queued else await api_manager.flush_outbox()
+    if flushed is not None:
+        print(
+            f"Записано из очереди: {len(flushed.written)}, ошибок: {len(flushed.failed)}",
+            file=sys.stderr
+        )
+    return EXIT_OK if report and complete else EXIT_PUSH_FAILED
+
+
+async def check_profile(profile: ServerProfile) -> bool:
+    checker = AuthManager()
+    try:
+        return await checker.test_credentials(profile.login, profile.password, profile.server)
+    finally:
+        await checker.close_session()
+
+
+def manage_profiles(auth_manager: AuthManager, args: argparse.Namespace) -> int:
+    """Список, добавление и удаление дополнительных серверов"""
+    if not auth_manager.load_credentials():
+        print("Сначала сохраните основной сервер в окне настроек", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.action == "add":
+        password = args.profile_password or os.environ.get(PASSWORD_ENV)
+        if not password:
+            print(f"Не задан пароль (--password или {PASSWORD_ENV})", file=sys.stderr)
+            return EXIT_ERROR
+        profile = ServerProfile(args.name, args.profile_server, args.profile_login, password)
+        if not asyncio.run(check_profile(profile)):
+            print("Ошибка проверки данных", file=sys.stderr)
+            return EXIT_ERROR
+        profiles = [p for p in auth_manager.profiles if p.name != profile.name]
+        auth_manager.write_profiles(profiles + [profile])
+        return EXIT_OK
+
+    if args.action == "remove":
+        profiles = [p for p in auth_manager.profiles if p.name != args.name]
+        if len(profiles) == len(auth_manager.profiles):
+            print(f"Сервер не найден: {args.name}", file=sys.stderr)
+            return EXIT_ERROR
+        auth_manager.write_profiles(profiles)
+        return EXIT_OK
+
+    print(f"{auth_manager.server}\t{auth_manager.server}\t{auth_manager.login}\tосновной")
+    for profile in auth_manager.profiles:
+        print(f"{profile.name}\t{profile.server}\t{profile.login}")
+    return EXIT_OK
+
+
+def warn_offline(api_manager: Union[ApiManager, ServerGroup]):
+    if api_manager.offline:
+        print("Сервер недоступен, объекты учёта взяты из кэша", file=sys.stderr)
+
+
+async def list_sources(api_manager: Union[ApiManager, ServerGroup]) -> int:
+    source_nodes = await api_manager.get_source_nodes()
+    if source_nodes is None:
+        print("Не удалось получить объекты учёта с сервера", file=sys.stderr)
+        return EXIT_ERROR
+    warn_offline(api_manager)
+    for name in sorted(dict.fromkeys(node.src for node in source_nodes)):
+        print(name)
+    return EXIT_OK
+
+
+async def run(args: argparse.Namespace) -> int:
+    auth_manager = AuthManager()
+    primary = ApiManager(auth_manager)
+    if not configure_auth(auth_manager, args):
+        print("Не заданы сервер и логин", file=sys.stderr)
+        return EXIT_ERROR
+    api_manager = select_servers(primary, args.profile)
+    if api_manager is None:
+        print(f"Серверы не найдены: {', '.join(args.profile)}", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        if args.command == "push":
+            return await push(api_manager, args)
+        return await list_sources(api_manager)
+    finally:
+        await auth_manager.close_session()
+        if isinstance(api_manager, ServerGroup):
+            await api_manager.close_session()
+        else:
+            await api_manager.auth_manager.close_session()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    metrics.install(args.metrics, args.timings, argv=[])
+    if args.command == "profiles":
+        return manage_profiles(AuthManager(), args)
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return EXIT_ERROR
+    finally:
+        metrics.finish()
@@ -2,17 +2,61 @@
 WINDOW_WIDTH = 390
 WINDOW_HEIGHT = 500
 WINDOW_TITLE = "Импорт температуры холодной воды источников"
+SOURCES_PAGE_SIZE = 25  # строк источников на одной странице списка
+SOURCE_ROW_HEIGHT = 43  # высота строки источника, в пикселях
+WINDOW_CHROME_HEIGHT = 170  # поиск, листание и кнопки, в пикселях
 
 # Настройки API
 API_LOGIN_ENDPOINT = "/api/v1/Login"
 API_NODES_ENDPOINT = "/api/v1/Core/Nodes"
+NODES_STREAM_CHUNK_SIZE = 64 * 1024  # в байтах, кусок потокового чтения
+# Пакетная запись объектов учёта; None - не проверять поддержку сервером
+API_NODES_BULK_ENDPOINT = "/api/v1/Core/Nodes/Batch"
+# Отбор объектов учёта на сервере; параметры, которые сервер не знает,
+# он игнорирует, и нужные объекты всё равно отбираются при разборе
+API_NODES_FILTER = {"attributeCode": "sourceName"}
+# Постраничная загрузка; None - всегда загружать список целиком с проверкой
+# по ETag. Выключена, пока параметры страниц не проверены на сервере ЛЭРС
+API_NODES_PAGE_SIZE = None
+API_NODES_PAGE_PARAMS = ("skip", "take")  # смещение и размер страницы
+API_NODES_TOTAL_HEADER = "X-Total-Count"  # без него страницы не используются
+API_NODES_PAGE_CONCURRENCY = 4  # страниц загружается одновременно
+
+# Настройки пула HTTP-соединений
+HTTP_POOL_LIMIT = 32  # всего соединений
+HTTP_POOL_LIMIT_PER_HOST = 8  # соединений на один сервер
+HTTP_DNS_CACHE_TTL = 300  # в секундах
+HTTP_KEEPALIVE_TIMEOUT = 60  # в секундах
+
+# Настройки записи данных
+PUSH_MIN_CONCURRENCY = 1
+PUSH_INITIAL_CONCURRENCY = 4
+PUSH_MAX_CONCURRENCY = HTTP_POOL_LIMIT_PER_HOST  # не больше соединений на сервер
+PUSH_LATENCY_TARGET = 1.0  # в секундах, дольше - снижаем параллельность
+PUSH_REQUEST_TIMEOUT = 30  # в секундах на один запрос
+PUSH_BATCH_SIZE = 100  # объектов учёта в одном пакетном запросе
+PUSH_RETRY_ATTEMPTS = 5  # попыток на объект учёта
+PUSH_RETRY_BASE_DELAY = 0.5  # в секундах
+PUSH_RETRY_MAX_DELAY = 30  # в секундах
+PUSH_UNREACHABLE_ATTEMPTS = 3  # попыток подряд без ответа - сервер недоступен
+PUSH_PROGRESS_INTERVAL = 0.2  # в секундах между событиями хода записи
+PUSH_JOURNAL_FILE = "push_journal.json"
+PUSH_JOURNAL_TIMEOUT = 86400  # в секундах, старый журнал не учитывается
+PUSH_OUTBOX_FILE = "push_outbox.json"  # значения, ожидающие доступности сервера
+PUSH_OUTBOX_INTERVAL = 60  # в секундах между попытками отправить очередь
+PUSH_OUTBOX_BATCH = 500  # объектов учёта за одну отправку из очереди
 
 # Настройки шифрования
 ENCRYPTION_KEY_BASE = 'Pv2PXujA19CmIidkigTbaYxv2gZosW8cdmypsvhVDP0='
+ENCRYPTION_USE_KEYRING = True  # хранить вычисленный ключ в хранилище ОС
+KEYRING_SERVICE = "TcwImport"
 
 # Настройки файлов
 CREDENTIALS_FILE = "credentials.txt"
 ICON_PATH = "/icon-32.ico"
+NODES_CACHE_FILE = "nodes_cache.json"
+STARTUP_REPORT_FILE = "startup_report.txt"
+STARTUP_REPORT_TOP = 30  # строк с импортами в отчёте о запуске
 
 # Регулярные выражения для валидации
 SERVER_PATTERN = (
@@ -25,3 +69,5 @@ NUMBER_PATTERN = r'^-?[0-9]{1,2}[.,]?[0-9]{0,2}$'
 
 # Настройки кэширования
 API_KEY_CACHE_TIMEOUT = 3000  # в секундах
+API_KEY_REFRESH_MARGIN = 300  # в секундах, обновление ключа до истечения
+NODES_CACHE_TTL = 600  # в секундах, затем кэш объектов проверяется на сервере
@@ -1,148 +1,419 @@
 import asyncio
+import time
 import aiohttp
-import numpy as np
-from typing import List, Dict, Any, Optional
-from config.settings import API_NODES_ENDPOINT
+from typing import Callable, List, Dict, Any, Iterable, Optional, Tuple
+from config.settings import (
+    API_NODES_ENDPOINT,
+    API_NODES_FILTER,
+    API_NODES_PAGE_SIZE,
+    API_NODES_PAGE_PARAMS,
+    API_NODES_TOTAL_HEADER,
+    API_NODES_PAGE_CONCURRENCY,
+    NODES_STREAM_CHUNK_SIZE,
+    PUSH_OUTBOX_BATCH
+)
+from core.cache import NodeCache
+from core.http import HttpPool
+from core.journal import PushJournal
+from core.outbox import PushOutbox
+from core.merge import MergeResult, SourceIndex
+from core.model import PushItem, SourceNode
+from core.push import PushEngine, PushItemResult, PushProgress, PushReport
+from core.transport import PatchTransport, probe_transport
+from utils import metrics
+from utils.json_stream import JsonArrayStream
 
 
 class ApiManager:
-    def __init__(self, auth_manager):
+    def __init__(
+        self,
+        auth_manager,
+        http_pool: Optional[HttpPool] = None,
+        journal: Optional[PushJournal] = None,
+        node_cache: Optional[NodeCache] = None,
+        outbox: Optional[PushOutbox] = None
+    ):
         self.auth_manager = auth_manager
-        self._session: Optional[aiohttp.ClientSession] = None
+        self.http_pool = http_pool or auth_manager.http_pool
+        self.journal = journal or PushJournal()
+        self.node_cache = node_cache or NodeCache()
+        self.outbox = outbox or PushOutbox()
+        # Запись из окна и отправка очереди не идут одновременно
+        self._push_lock = asyncio.Lock()
+        self._transports: Dict[str, PatchTransport] = {}
+        self._engine: Optional[PushEngine] = None
+        # Размер страницы при загрузке объектов учёта; None - список целиком
+        self.page_size = API_NODES_PAGE_SIZE
+        # Объекты учёта взяты из устаревшего кэша: сервер недоступен
+        self.offline = False
+        # Учётные данные, с которыми сервер отклонил вход при отправке очереди
+        self._rejected_credentials: Optional[Tuple[str, str, str]] = None
 
-    async def __aenter__(self):
-        await self.get_session()
-        return self
+    async def get_session(self) -> aiohttp.ClientSession:
+        return await self.http_pool.get_session()
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.close_session()
+    async def close_session(self):
+        await self.http_pool.close()
 
-    async def get_session(self) -> aiohttp.ClientSession:
+    def invalidate_cache(self):
+        """Сброс кэша объектов учёта, следующий запрос загрузит их заново"""
+        self.node_cache.invalidate()
+
+    async def get_source_nodes(self, force_refresh: bool = False) -> Optional[List[SourceNode]]:
+        """Объекты учёта с атрибутом sourceName
+
+        Если сервер недоступен, возвращается кэш независимо от срока
+        давности и выставляется offline: значения по нему уйдут в очередь.
+        """
+        server = self.auth_manager.server
+        if not force_refresh:
+            cached = self.node_cache.get_fresh(server)
+            if cached is not None:
+                return cached
+
+        source_nodes = await self._download_nodes()
+        self.offline = source_nodes is None
+        if source_nodes is None:
+            return self.node_cache.get(server)
+        return source_nodes
+
+    async def _download_nodes(self) -> Optional[List[SourceNode]]:
+        server = self.auth_manager.server
         try:
-            if self._session is None or self._session.closed:
-                self._session = aiohttp.ClientSession(
-                    connector=aiohttp.TCPConnector(force_close=True))
-            return self._session
+            session = await self.get_session()
+            # Итог проверки страниц хранится в кэше: сервер без них
+            # не загружает первую страницу заново при каждом запуске
+            if not self.page_size or self.node_cache.paging(server) is False:
+                return await self._fetch_all(session)
+            source_nodes, paging = await self._fetch_pages(session)
+            if source_nodes is not None:
+                self.node_cache.store(server, source_nodes)
+            else:
+                source_nodes = await self._fetch_all(session)
+                paging = False
+            if source_nodes is not None:
+                self.node_cache.set_paging(server, paging)
+            return source_nodes
         except Exception:
-            raise
+            return None
 
-    async def close_session(self):
+    async def _fetch_all(self, session: aiohttp.ClientSession) -> Optional[List[SourceNode]]:
+        """Загрузка всего списка с проверкой актуальности кэша по ETag"""
+        server = self.auth_manager.server
+        status, headers, source_nodes, _ = await self._request_nodes(
+            session, {"getAttributes": "True"}, self.node_cache.validators(server))
+        if status == 304:
+            self.node_cache.touch(server)
+            return self.node_cache.get(server)
+        if source_nodes is None:
+            return None
+        self.node_cache.store(
+            server,
+            source_nodes,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified')
+        )
+        return source_nodes
+
+    async def _fetch_pages(
+        self,
+        session: aiohttp.ClientSession
+    ) -> Tuple[Optional[List[SourceNode]], bool]:
+        """Постраничная загрузка с отбором на сервере
+
+        Возвращает объекты учёта (None - загрузить список целиком) и
+        признак того, что сервер поддерживает страницы.
+
+        Страницы после первой загружаются параллельно, их число берётся из
+        заголовка API_NODES_TOTAL_HEADER. Без него нельзя отличить последнюю
+        страницу от урезанной сервером, и загрузка идёт целиком. Шаг страниц
+        равен длине первой: сервер может ограничить её меньше запрошенной.
+        """
+        size = self.page_size
+        skip, take = API_NODES_PAGE_PARAMS
+
+        def page_params(offset: int) -> Dict[str, Any]:
+            return {
+                "getAttributes": "True",
+                **(API_NODES_FILTER or {}),
+                skip: offset,
+                take: size
+            }
+
+        _, headers, first, count = await self._request_nodes(session, page_params(0))
+        if first is None:
+            return None, False
+        if count > size:
+            # Сервер не знает параметров страницы и прислал всё сразу
+            return first, False
         try:
-            if self._session and not self._session.closed:
-                await self._session.close()
-                self._session = None
-        except Exception:
-            raise
+            total = int(headers.get(API_NODES_TOTAL_HEADER))
+        except (TypeError, ValueError):
+            return None, False
+        if count >= total:
+            return first, True
+        if count == 0:
+            return None, False
 
-    async def get_node_attributes(self) -> Dict[str, Any]:
-        async with self:  # Используем контекстный менеджер
-            api_key = await self.auth_manager.get_api_key()
-            if not api_key:
-                return None
+        semaphore = asyncio.Semaphore(API_NODES_PAGE_CONCURRENCY)
+
+        async def fetch(offset: int) -> Tuple[Optional[List[SourceNode]], int]:
+            async with semaphore:
+                _, _, nodes, page_count = await self._request_nodes(session, page_params(offset))
+                return nodes, page_count
 
-            url = f"{self.auth_manager.server}{API_NODES_ENDPOINT}?getAttributes=True"
+        pages = await asyncio.gather(*(fetch(offset) for offset in range(count, total, count)))
+        if any(nodes is None for nodes, _ in pages):
+            return None, False
+        # Страница короче первой не на конце списка - часть объектов пропущена
+        if count + sum(page_count for _, page_count in pages) != total:
+            return None, False
+        for nodes, _ in pages:
+            first.extend(nodes)
+        return first, True
+
+    async def _request_nodes(
+        self,
+        session: aiohttp.ClientSession,
+        params: Dict[str, Any],
+        extra_headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Any, Optional[List[SourceNode]], int]:
+        """GET объектов учёта с одним повторным входом при ответе 401
+
+        Возвращает статус, заголовки, объекты учёта с sourceName (None,
+        если ответ не 200) и число объектов в ответе до отбора.
+        """
+        url = f"{self.auth_manager.server}{API_NODES_ENDPOINT}"
+        api_key = await self.auth_manager.get_api_key()
+        for _ in range(2):
+            if not api_key:
+                break
             headers = {
                 'Content-Type': 'application/json',
                 'Accept': 'application/json',
-                'Authorization': f'Bearer {api_key}'
+                'Authorization': f'Bearer {api_key}',
+                **(extra_headers or {})
             }
+            with metrics.span("nodes.fetch") as span:
+                async with session.get(url, params=params, headers=headers) as response:
+                    span["status"] = response.status
+                    if response.status == 401:
+                        # Ключ истёк раньше срока - входим заново один раз
+                        api_key = await self.auth_manager.refresh_api_key(api_key)
+                        continue
+                    if response.status != 200:
+                        return response.status, response.headers, None, 0
+                    source_nodes, count = await self._read_source_nodes(response)
+                    span["nodes"] = count
+                    return response.status, response.headers, source_nodes, count
+        return 401, {}, None, 0
 
-            try:
-                session = await self.get_session()
-                async with session.get(url, headers=headers) as response:
-                    response.raise_for_status()
-                    return await response.json()
-            except Exception:
-                return None
+    @staticmethod
+    async def _read_source_nodes(response: aiohttp.ClientResponse) -> Tuple[List[SourceNode], int]:
+        # Ответ разбирается по мере поступления, целиком в памяти не хранится
+        parser = JsonArrayStream('nodes')
+        source_nodes = []
+        count = 0
+        # Разбор идёт вперемешку с загрузкой, его время считаем отдельно
+        parse_time = 0.0
+        size = 0
+        async for chunk in response.content.iter_chunked(NODES_STREAM_CHUNK_SIZE):
+            started = time.perf_counter()
+            size += len(chunk)
+            for node in parser.feed(chunk):
+                count += 1
+                source_nodes.extend(ApiManager._extract_source_nodes(node))
+            parse_time += time.perf_counter() - started
+        parser.close()
+        metrics.record("nodes.parse", parse_time, bytes=size, nodes=count)
+        return source_nodes, count
 
-    async def get_sources_names(self) -> List[str]:
-        data = await self.get_node_attributes()
+    @staticmethod
+    def _extract_source_nodes(node: Dict[str, Any]) -> List[SourceNode]:
+        # Текущие значения Тхв нужны, чтобы не отправлять неизменённые
+        return [
+            SourceNode(
+                attr['value'],
+                attr.get('nodeId', node.get('id')),
+                node.get('coldWaterSummerTemp'),
+                node.get('coldWaterWinterTemp')
+            )
+            for attr in node.get('attributes') or []
+            if attr.get('code') == 'sourceName'
+        ]
+
+    async def get_sources_names(self, force_refresh: bool = False) -> List[str]:
+        source_nodes = await self.get_source_nodes(force_refresh)
         source_names = []
-        if data is not None:
-            for node in data['nodes']:
-                if node['attributes'] is not None:
-                    for attr in node['attributes']:
-                        if attr['code'] == 'sourceName':
-                            source_names.append(attr['value'])
+        if source_nodes is not None:
+            source_names = [node.src for node in source_nodes]
         source_names = list(dict.fromkeys(source_names))
         source_names.sort()
         return source_names
 
-    async def filter_node_attributes(self, labels: List[str]) -> List[List[str]]:
-        data = await self.get_node_attributes()
-        if not data:
+    async def filter_node_attributes(self, labels: List[str]) -> List[List[Any]]:
+        source_nodes = await self.get_source_nodes()
+        if not source_nodes:
             return []
 
-        values = []
-        node_ids = []
-        for node in data['nodes']:
-            if node['attributes'] is not None:
-                for attr in node['attributes']:
-                    if attr['value'] in labels:
-                        node_ids.append(attr['nodeId'])
-                        values.append(attr['value'])
-        return np.column_stack((values, node_ids)).tolist()
-
-    async def push_temperature_data(self, data: List[Dict[str, Any]]) -> bool:
-        api_key = await self.auth_manager.get_api_key()
-        if not api_key:
-            return False
+        labels = set(labels)
+        return [
+            [node.src, node.nodeid]
+            for node in source_nodes
+            if node.src in labels
+        ]
 
-        headers = {
-            'Content-Type': 'application/json-patch+json',
-            'Authorization': f'Bearer {api_key}'
-        }
+    async def plan_push(
+        self,
+        temp_data: Iterable[Dict[str, Any]],
+        skip_unchanged: bool = True
+    ) -> Optional[MergeResult]:
+        """Сопоставление температур с объектами учёта без записи на сервер
 
-        session = await self.get_session()
-        tasks = []
+        temp_data может быть потоком записей из файла: он читается уже после
+        загрузки объектов учёта, строка за строкой.
+        """
+        # Без сервера сопоставление идёт по кэшу, значения уйдут в очередь
+        source_nodes = await self.get_source_nodes()
+        if source_nodes is None:
+            return None
+        with metrics.span("merge") as span:
+            plan = SourceIndex(source_nodes).merge(temp_data, skip_unchanged)
+            span["items"] = len(plan.items)
+        queued = {item.nodeid for item in self.outbox.pending(self.auth_manager.server)}
+        if queued and plan.unchanged:
+            # В очереди другое значение: без записи оно позже затёрло бы это
+            plan.items.extend(item for item in plan.unchanged if item.nodeid in queued)
+            plan.unchanged = [item for item in plan.unchanged if item.nodeid not in queued]
+        return plan
 
-        # Создаем задачи для каждого элемента данных
-        for item in data:
-            task = asyncio.create_task(
-                self._push_single_temperature(session, headers, item)
-            )
-            tasks.append(task)
+    async def get_transport(self, session: aiohttp.ClientSession) -> PatchTransport:
+        """Транспорт записи, выбранный по возможностям сервера после входа"""
+        server = self.auth_manager.server
+        if server not in self._transports:
+            self._transports[server] = await probe_transport(self.auth_manager, session)
+        return self._transports[server]
 
-        # Ждем выполнения всех задач
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    def cancel_push(self):
+        """Отмена текущей записи; вызывается в цикле событий записи"""
+        if self._engine is not None:
+            self._engine.cancel()
 
-        # Проверяем результаты
-        return all(isinstance(r, bool) and r for r in results)
+    async def push_temperature_data(
+        self,
+        data: List[PushItem],
+        on_progress: Optional[Callable[[PushProgress], None]] = None
+    ) -> PushReport:
+        """Запись значений; при недоступности сервера они ставятся в очередь"""
+        server = self.auth_manager.server
+        async with self._push_lock:
+            report = await self._push(data, on_progress)
+            # Новое значение заменяет ожидающее в очереди
+            self.outbox.discard(server, [r.item for r in report.written], any_value=True)
+            if not report.cancelled:
+                report.queued = [
+                    r.item for r in report.failed
+                    if r.transient and r.error != "cancelled"
+                ]
+                self.outbox.put(server, report.queued)
+        return report
 
-    async def _push_single_temperature(
+    async def flush_outbox(self) -> Optional[PushReport]:
+        """Отправка очереди пакетами, если сервер снова доступен
+
+        Каждый объект учёта получает одно, последнее значение. Отправка
+        прекращается при первой ошибке связи, до следующего вызова.
+        """
+        server = self.auth_manager.server
+        if not self.outbox.pending(server):
+            return None
+        auth_manager = self.auth_manager
+        credentials = (server, auth_manager.login, auth_manager.password)
+        if credentials == self._rejected_credentials:
+            # Вход отклонён, ждём новых учётных данных
+            return None
+        # Кэшированный ключ ничего не говорит о доступности сервера:
+        # повторный вход проверяет её одним запросом, не отправляя значений
+        if not await auth_manager.refresh_api_key(None):
+            if auth_manager.login_rejected:
+                self._rejected_credentials = credentials
+            return None
+        self._rejected_credentials = None
+        report = PushReport()
+        while True:
+            async with self._push_lock:
+                # Очередь перечитывается: запись из окна могла её изменить
+                batch = self.outbox.pending(server)[:PUSH_OUTBOX_BATCH]
+                if not batch:
+                    break
+                result = await self._push(batch)
+                # Значение, отклонённое сервером, повторять бесполезно
+                self.outbox.discard(server, [
+                    r.item for r in result.results
+                    if r.success or not r.transient
+                ])
+            report.results.extend(result.results)
+            if result.cancelled or any(r.transient for r in result.failed):
+                break
+        return report
+
+    async def _push(
         self,
-        session: aiohttp.ClientSession,
-        headers: Dict[str, str],
-        item: Dict[str, Any]
-    ) -> bool:
+        data: List[PushItem],
+        on_progress: Optional[Callable[[PushProgress], None]] = None
+    ) -> PushReport:
+        api_key = await self.auth_manager.get_api_key()
+        if not api_key:
+            # Со статусом отказа во входе значения не ставятся в очередь
+            return PushReport([
+                PushItemResult(
+                    item, False,
+                    status=self.auth_manager.login_status,
+                    error="authorization failed"
+                )
+                for item in data
+            ])
+
+        # Объекты, записанные незавершённым прошлым запуском, не отправляем
+        pending, done = self.journal.begin(self.auth_manager.server, data)
+        report = PushReport([
+            PushItemResult(item, True, skipped=True) for item in done
+        ])
+
+        session = await self.get_session()
+        transport = await self.get_transport(session)
+        engine = PushEngine(
+            lambda batch: transport.send(session, batch),
+            on_result=self._journal_result,
+            batch_size=lambda: transport.batch_size,
+            on_progress=on_progress
+        )
+        progress = PushProgress(total=len(data), done=len(done), skipped=len(done))
+        self._engine = engine
         try:
-            node_id = item["nodeid"]
-            tcw = float(item["tcw"])
-            push = [
-                {
-                    "op": "replace",
-                    "value": tcw,
-                    "path": "coldWaterSummerTemp"
-                },
-                {
-                    "op": "replace",
-                    "value": tcw,
-                    "path": "coldWaterWinterTemp"
-                }
-            ]
-            url = f"{self.auth_manager.server}{API_NODES_ENDPOINT}/{node_id}"
-
-            async with session.patch(url, headers=headers, json=push) as response:
-                response.raise_for_status()
-                return True
-        except Exception:
-            return False
+            with metrics.span("push", items=len(pending)) as span:
+                result = await engine.run(pending, progress)
+                span["failed"] = len(result.failed)
+        except BaseException:
+            self.journal.flush()
+            raise
+        finally:
+            self._engine = None
+        report.cancelled = result.cancelled
+        report.results.extend(result.results)
+        self.journal.finish(bool(report))
+        self.node_cache.update_values(self.auth_manager.server, {
+            r.item.nodeid: float(r.item.tcw) for r in report.succeeded
+        })
+        if any(r.status == 404 for r in report.failed):
+            # Объект учёта удалён на сервере - кэш устарел
+            self.invalidate_cache()
+        return report
+
+    def _journal_result(self, result: PushItemResult):
+        if result.success:
+            self.journal.mark_done(result.item)
 
     @staticmethod
-    def merge_data(node_data: List[Dict[str, Any]], temp_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        return [
-            {"nodeid": item1["nodeid"], "tcw": item2["tcw"]}
-            for item1 in node_data
-            for item2 in temp_data
-            if item1["src"] == item2["src"]
-        ]
+    def merge_data(node_data: List[SourceNode], temp_data: List[Dict[str, Any]]) -> List[PushItem]:
+        return SourceIndex(node_data).merge(temp_data).items
@@ -1,62 +1,69 @@
 import time
 import json
+import asyncio
 import aiohttp
-from typing import Optional
+from typing import List, Optional
 from config.settings import (
     API_LOGIN_ENDPOINT,
     CREDENTIALS_FILE,
-    API_KEY_CACHE_TIMEOUT
+    API_KEY_CACHE_TIMEOUT,
+    API_KEY_REFRESH_MARGIN
 )
 from core.encryption import encrypt_data, decrypt_data
+from core.http import HttpPool
+from core.profiles import ServerProfile
+from utils import metrics
 
 
 class AuthManager:
-    def __init__(self):
+    def __init__(self, http_pool: Optional[HttpPool] = None):
         self.login = ""
         self.password = ""
         self.server = ""
         self.api_key_cache = {"key": None, "timestamp": 0}
-        self._session: Optional[aiohttp.ClientSession] = None
-
-    async def __aenter__(self):
-        """Контекстный менеджер для сессии"""
-        await self.get_session()
-        return self
-
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Закрытие сессии при выходе из контекста"""
-        await self.close_session()
+        # Дополнительные серверы; основной задан server/login/password
+        self.profiles: List[ServerProfile] = []
+        self.http_pool = http_pool or HttpPool()
+        # Статус ответа на последний вход; None - сервер не ответил
+        self.login_status: Optional[int] = None
+        self._login_task: Optional[asyncio.Task] = None
+        self._refresh_handle: Optional[asyncio.TimerHandle] = None
 
     async def get_session(self) -> aiohttp.ClientSession:
-        """Получение или создание сессии"""
-        try:
-            if self._session is None or self._session.closed:
-                self._session = aiohttp.ClientSession(
-                    connector=aiohttp.TCPConnector(force_close=True))
-            return self._session
-        except Exception:
-            raise
+        """Получение сессии из общего пула соединений"""
+        return await self.http_pool.get_session()
 
     async def close_session(self):
-        """Закрытие сессии"""
-        try:
-            if self._session and not self._session.closed:
-                await self._session.close()
-                self._session = None
-        except Exception:
-            raise
+        """Закрытие пула соединений"""
+        self._cancel_refresh()
+        await self.http_pool.close()
 
     def write_credentials(self, login: str, password: str, server: str):
         """Сохранение учетных данных"""
         self.login = login
         self.password = password
         self.server = server
-        data = json.dumps({
-            "login": login,
-            "password": password,
-            "server": server
-        })
-        encrypted_data = encrypt_data(data)
+        self.invalidate_api_key()
+        self._save_credentials()
+
+    def write_profiles(self, profiles: List[ServerProfile]):
+        """Сохранение списка дополнительных серверов"""
+        self.profiles = list(profiles)
+        self._save_credentials()
+
+    def primary_profile(self) -> ServerProfile:
+        return ServerProfile(self.server, self.server, self.login, self.password)
+
+    def _save_credentials(self):
+        credentials = {
+            "login": self.login,
+            "password": self.password,
+            "server": self.server
+        }
+        # Без дополнительных серверов формат файла прежний
+        if self.profiles:
+            credentials["profiles"] = [p.to_dict() for p in self.profiles]
+        encrypted_data = encrypt_data(json.dumps(credentials))
         with open(CREDENTIALS_FILE, "w+") as txt_file:
             txt_file.write(encrypted_data)
 
@@ -68,13 +75,18 @@ class AuthManager:
                 encrypted_data = file.read().strip()
 
                 # Расшифровываем и загружаем данные
-                decrypted_data = decrypt_data(encrypted_data)
+                with metrics.span("credentials.decrypt"):
+                    decrypted_data = decrypt_data(encrypted_data)
                 credentials = json.loads(decrypted_data)
 
                 # Загружаем данные
                 self.login = credentials["login"]
                 self.password = credentials["password"]
                 self.server = credentials["server"]
+                self.profiles = [
+                    ServerProfile.from_dict(profile)
+                    for profile in credentials.get("profiles", [])
+                ]
 
                 return True
         except FileNotFoundError:
@@ -86,55 +98,101 @@ class AuthManager:
 
     async def test_credentials(self, login: str, password: str, server: str) -> bool:
         """Проверка учетных данных"""
-        async with self:  # Используем контекстный менеджер
-            url = f"{server}{API_LOGIN_ENDPOINT}"
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json'
-            }
-            data = {
-                "login": login,
-                "password": password,
-                "code": "",
-                "application": ""
-            }
-
-            try:
-                session = await self.get_session()
-                async with session.post(url, headers=headers, json=data) as response:
-                    response.raise_for_status()
-                    return True
-            except Exception:
-                return False
+        url = f"{server}{API_LOGIN_ENDPOINT}"
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        data = {
+            "login": login,
+            "password": password,
+            "code": "",
+            "application": ""
+        }
+
+        try:
+            session = await self.get_session()
+            async with session.post(url, headers=headers, json=data) as response:
+                response.raise_for_status()
+                return True
+        except Exception:
+            return False
 
-    async def get_api_key(self) -> str:
+    def _cached_api_key(self) -> Optional[str]:
+        if (self.api_key_cache["key"] is not None and
+                time.time() - self.api_key_cache["timestamp"] < API_KEY_CACHE_TIMEOUT):
+            return self.api_key_cache["key"]
+        return None
+
+    @property
+    def login_rejected(self) -> bool:
+        """Сервер ответил на вход отказом: повторять с теми же данными бесполезно"""
+        return self.login_status is not None and 400 <= self.login_status < 500
+
+    def invalidate_api_key(self, token: Optional[str] = None):
+        """Сброс API ключа (только если он совпадает с token, когда тот указан)"""
+        if token is None or self.api_key_cache["key"] == token:
+            self.api_key_cache = {"key": None, "timestamp": 0}
+            self._cancel_refresh()
+
+    async def get_api_key(self) -> Optional[str]:
         """Получение API ключа с кэшированием"""
-        async with self:  # Используем контекстный менеджер
-            current_time = time.time()
-            if (self.api_key_cache["key"] is not None and
-                    current_time - self.api_key_cache["timestamp"] < API_KEY_CACHE_TIMEOUT):
-                return self.api_key_cache["key"]
-
-            url = f"{self.server}{API_LOGIN_ENDPOINT}"
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            data = {
-                "login": self.login,
-                "password": self.password,
-                "code": "",
-                "application": ""
-            }
-
-            try:
+        token = self._cached_api_key()
+        if token is not None:
+            return token
+        return await asyncio.shield(self._start_login())
+
+    async def refresh_api_key(self, rejected_token: Optional[str]) -> Optional[str]:
+        """Повторный вход после ответа 401 на запрос с rejected_token"""
+        self.invalidate_api_key(rejected_token)
+        return await self.get_api_key()
+
+    def _start_login(self) -> asyncio.Task:
+        # Одновременные вызовы ожидают один и тот же запрос входа
+        loop = asyncio.get_running_loop()
+        task = self._login_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._login())
+            self._login_task = task
+        return task
+
+    def _schedule_refresh(self):
+        self._cancel_refresh()
+        delay = max(0, API_KEY_CACHE_TIMEOUT - API_KEY_REFRESH_MARGIN)
+        self._refresh_handle = asyncio.get_running_loop().call_later(
+            delay, self._start_login)
+
+    def _cancel_refresh(self):
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+    async def _login(self) -> Optional[str]:
+        current_time = time.time()
+        url = f"{self.server}{API_LOGIN_ENDPOINT}"
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        data = {
+            "login": self.login,
+            "password": self.password,
+            "code": "",
+            "application": ""
+        }
+
+        self.login_status = None
+        try:
+            with metrics.span("login") as span:
                 session = await self.get_session()
                 async with session.post(url, headers=headers, json=data) as response:
+                    span["status"] = self.login_status = response.status
                     response.raise_for_status()
                     result = await response.json()
-                    token = result["token"]
-                    self.api_key_cache["key"] = token
-                    self.api_key_cache["timestamp"] = current_time
-                    return token
-            except Exception:
-                return False
+            token = result["token"]
+            self.api_key_cache["key"] = token
+            self.api_key_cache["timestamp"] = current_time
+            self._schedule_refresh()
+            return token
+        except Exception:
+            return None
@@ -0,0 +1,140 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+from config.settings import NODES_CACHE_FILE, NODES_CACHE_TTL
+from core.model import SourceNode
+
+# Записи хранятся строками [src, nodeid, summer, winter]; кэш
+# прежнего формата со словарями просто загружается заново
+CACHE_FORMAT = 2
+
+
+class NodeCache:
+    """Кэш соответствия источник -> объект учёта в памяти и на диске"""
+
+    def __init__(self, path: Optional[str] = NODES_CACHE_FILE, ttl: float = NODES_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entry: Optional[Dict[str, Any]] = None
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+            if entry.get("format") == CACHE_FORMAT:
+                entry["records"] = [SourceNode.from_row(row) for row in entry["records"]]
+                self._entry = entry
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, KeyError, AttributeError, OSError):
+            pass
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump({
+                    **self._entry,
+                    "format": CACHE_FORMAT,
+                    "records": [node.to_row() for node in self._entry["records"]]
+                }, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _get(self, server: str) -> Optional[Dict[str, Any]]:
+        self._load()
+        if self._entry is not None and self._entry.get("server") == server:
+            return self._entry
+        return None
+
+    def get(self, server: str) -> Optional[List[SourceNode]]:
+        """Записи из кэша независимо от срока давности"""
+        entry = self._get(server)
+        return entry["records"] if entry else None
+
+    def get_fresh(self, server: str) -> Optional[List[SourceNode]]:
+        """Записи из кэша, если не истёк срок NODES_CACHE_TTL"""
+        entry = self._get(server)
+        if entry and time.time() - entry["timestamp"] < self.ttl:
+            return entry["records"]
+        return None
+
+    def validators(self, server: str) -> Dict[str, str]:
+        """Заголовки условного запроса для проверки актуальности кэша"""
+        entry = self._get(server)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(
+        self,
+        server: str,
+        records: List[SourceNode],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        previous = self._get(server)
+        self._entry = {
+            "server": server,
+            "timestamp": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "paging": previous.get("paging") if previous else None,
+            "records": records
+        }
+        self._save()
+
+    def paging(self, server: str) -> Optional[bool]:
+        """Поддержка постраничной загрузки сервером; None - ещё не проверена"""
+        entry = self._get(server)
+        return entry.get("paging") if entry else None
+
+    def set_paging(self, server: str, supported: bool):
+        entry = self._get(server)
+        if entry and entry.get("paging") != supported:
+            entry["paging"] = supported
+            self._save()
+
+    def update_values(self, server: str, values: Dict[Any, float]):
+        """Запись в кэш значений Тхв, успешно отправленных на сервер"""
+        entry = self._get(server)
+        if not entry or not values:
+            return
+        for node in entry["records"]:
+            if node.nodeid in values:
+                node.summer = node.winter = values[node.nodeid]
+        self._save()
+
+    def touch(self, server: str):
+        """Продление срока кэша после ответа 304 Not Modified"""
+        entry = self._get(server)
+        if entry:
+            entry["timestamp"] = time.time()
+            self._save()
+
+    def invalidate(self):
+        """Ручной сброс кэша"""
+        self._loaded = True
+        self._entry = None
+        if not self.path:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            pass
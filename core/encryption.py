@@ -1,10 +1,19 @@
 import base64
+import hashlib
 import subprocess
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+import threading
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
+from config.settings import ENCRYPTION_USE_KEYRING, KEYRING_SERVICE
 
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
 
+_key_lock = threading.Lock()
+_fernet: Optional["Fernet"] = None
+
+
+@lru_cache(maxsize=1)
 def get_machine_id() -> str:
     try:
         serial = subprocess.check_output(
@@ -22,24 +31,91 @@ def get_machine_id() -> str:
         return "fallback_id"
 
 
-def get_encryption_key() -> Fernet:
+@lru_cache(maxsize=1)
+def _get_keyring():
+    # Необязательная зависимость, загружается при первом обращении
+    if not ENCRYPTION_USE_KEYRING:
+        return None
     try:
-        salt = b'TcwImport_salt_123'
-        machine_id = get_machine_id()
-
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=480000,
-        )
+        import keyring
+        return keyring
+    except ImportError:
+        return None
+
+
+def _keyring_user(machine_id: str) -> str:
+    # Ключ в хранилище привязан к машине, чужой идентификатор не совпадёт
+    return hashlib.sha256(machine_id.encode()).hexdigest()[:32]
 
-        key = base64.urlsafe_b64encode(kdf.derive(machine_id.encode()))
-        return Fernet(key)
+
+def _load_stored_key(machine_id: str) -> Optional[bytes]:
+    keyring = _get_keyring()
+    if keyring is None:
+        return None
+    try:
+        key = keyring.get_password(KEYRING_SERVICE, _keyring_user(machine_id))
+        return key.encode() if key else None
+    except Exception:
+        return None
+
+
+def _store_key(machine_id: str, key: bytes):
+    keyring = _get_keyring()
+    if keyring is None:
+        return
+    try:
+        keyring.set_password(
+            KEYRING_SERVICE, _keyring_user(machine_id), key.decode())
+    except Exception:
+        pass
+
+
+def derive_key(machine_id: str) -> bytes:
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    salt = b'TcwImport_salt_123'
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=480000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(machine_id.encode()))
+
+
+def get_encryption_key() -> "Fernet":
+    """Ключ шифрования: вычисляется один раз на процесс"""
+    from cryptography.fernet import Fernet
+    global _fernet
+    try:
+        with _key_lock:
+            if _fernet is None:
+                machine_id = get_machine_id()
+                key = _load_stored_key(machine_id)
+                if key is None:
+                    key = derive_key(machine_id)
+                    _store_key(machine_id, key)
+                _fernet = Fernet(key)
+            return _fernet
     except Exception:
         raise
 
 
+def invalidate_encryption_key(forget_stored: bool = False):
+    """Сброс кэша ключа, при forget_stored - и копии в хранилище ОС"""
+    global _fernet
+    keyring = _get_keyring()
+    with _key_lock:
+        if forget_stored and keyring is not None:
+            try:
+                keyring.delete_password(
+                    KEYRING_SERVICE, _keyring_user(get_machine_id()))
+            except Exception:
+                pass
+        _fernet = None
+        get_machine_id.cache_clear()
+
+
 def encrypt_data(data: str) -> str:
     try:
         if not data:
@@ -0,0 +1,56 @@
+import asyncio
+import aiohttp
+from typing import Optional
+from config.settings import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT
+)
+from utils import metrics
+from utils.ssl_verify import get_ssl_context
+
+
+class HttpPool:
+    """Общий пул keep-alive соединений для AuthManager и ApiManager"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ssl_context = None
+
+    def _create_connector(self) -> aiohttp.TCPConnector:
+        """Создание коннектора с лимитами и DNS-кэшем"""
+        if self._ssl_context is None:
+            self._ssl_context = get_ssl_context()
+        return aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ssl=self._ssl_context
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Получение общей сессии или создание новой"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            # Сессия привязана к другому циклу событий и не может
+            # использоваться в текущем, соединения просто отбрасываются
+            self._session = None
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=self._create_connector(),
+                trace_configs=metrics.trace_configs()
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        """Закрытие сессии и всех соединений пула"""
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            return
+        await session.close()
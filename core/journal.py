@@ -0,0 +1,101 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+from config.settings import PUSH_JOURNAL_FILE, PUSH_JOURNAL_TIMEOUT
+from core.model import PushItem
+
+
+class PushJournal:
+    """Журнал незавершённой записи: повторный запуск досылает только хвост
+
+    Файл дописывается: первая строка - заголовок с сервером и временем
+    начала, далее по строке [nodeid, tcw] на каждый записанный объект.
+    """
+
+    def __init__(self, path: str = PUSH_JOURNAL_FILE, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self._done: Dict[Any, float] = {}
+        self._unsaved: List[str] = []
+
+    def _load(self, server: str) -> Dict[Any, float]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline())
+                if (header.get("server") != server or
+                        time.time() - header.get("timestamp", 0) >= PUSH_JOURNAL_TIMEOUT):
+                    return {}
+                done = {}
+                for line in file:
+                    try:
+                        node_id, tcw = json.loads(line)
+                    except ValueError:
+                        # Строка, оборванная при аварийном завершении
+                        continue
+                    done[node_id] = tcw
+                return done
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError, OSError):
+            pass
+        return {}
+
+    def begin(
+        self,
+        server: str,
+        items: List[PushItem]
+    ) -> Tuple[List[PushItem], List[PushItem]]:
+        """Разделение данных на неотправленные и уже записанные ранее"""
+        self._done = self._load(server)
+        self._unsaved = []
+        if not self._done:
+            self._start(server)
+
+        pending, done = [], []
+        for item in items:
+            if self._done.get(item.nodeid) == float(item.tcw):
+                done.append(item)
+            else:
+                pending.append(item)
+        return pending, done
+
+    def _start(self, server: str):
+        try:
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"server": server, "timestamp": time.time()}) + "\n")
+        except OSError:
+            pass
+
+    def mark_done(self, item: PushItem):
+        """Отметка успешно записанного объекта учёта"""
+        tcw = float(item.tcw)
+        self._done[item.nodeid] = tcw
+        self._unsaved.append(json.dumps([item.nodeid, tcw]))
+        if len(self._unsaved) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Дозапись накопленных отметок на диск"""
+        if not self._unsaved:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write("\n".join(self._unsaved) + "\n")
+            self._unsaved = []
+        except OSError:
+            pass
+
+    def finish(self, complete: bool):
+        """Завершение записи: журнал нужен только если остались ошибки"""
+        if not complete:
+            self.flush()
+            return
+        self._done = {}
+        self._unsaved = []
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            pass
@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+from core.model import PushItem, SourceNode
+
+
+def normalize_source_name(name: Any) -> str:
+    """Название источника без различий в регистре и пробелах"""
+    return " ".join(str(name).split()).casefold()
+
+
+def is_unchanged(node: SourceNode, tcw: Any) -> bool:
+    """Совпадает ли новое значение с хранящимися на сервере летней и зимней Тхв"""
+    try:
+        value = round(float(tcw), 2)
+        return all(
+            current is not None and round(float(current), 2) == value
+            for current in (node.summer, node.winter)
+        )
+    except (TypeError, ValueError):
+        return False
+
+
+@dataclass
+class MergeResult:
+    """Результат сопоставления температур с объектами учёта"""
+    items: List[PushItem] = field(default_factory=list)
+    unchanged: List[PushItem] = field(default_factory=list)
+    unmatched_sources: List[Any] = field(default_factory=list)
+    unmatched_nodes: List[SourceNode] = field(default_factory=list)
+
+
+class SourceIndex:
+    """Индекс объектов учёта по нормализованному названию источника"""
+
+    def __init__(self, node_data: Iterable[SourceNode] = ()):
+        self._nodes: Dict[str, List[SourceNode]] = {}
+        self.add(node_data)
+
+    def add(self, node_data: Iterable[SourceNode]):
+        for node in node_data:
+            key = normalize_source_name(node.src)
+            self._nodes.setdefault(key, []).append(node)
+
+    def __contains__(self, name: Any) -> bool:
+        return normalize_source_name(name) in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def nodes(self, name: Any) -> List[SourceNode]:
+        return self._nodes.get(normalize_source_name(name), [])
+
+    def merge(
+        self,
+        temp_data: Iterable[Dict[str, Any]],
+        skip_unchanged: bool = False
+    ) -> MergeResult:
+        """Сопоставление за O(n + m); при повторе источника берётся последнее значение
+
+        При skip_unchanged объекты, где значение уже записано, попадают
+        в unchanged, а не в items.
+        """
+        values: Dict[str, Any] = {}
+        result = MergeResult()
+        for item in temp_data:
+            key = normalize_source_name(item["src"])
+            if key in self._nodes:
+                values[key] = item["tcw"]
+            else:
+                result.unmatched_sources.append(item["src"])
+
+        for key, nodes in self._nodes.items():
+            if key not in values:
+                result.unmatched_nodes.extend(nodes)
+                continue
+            tcw = values[key]
+            for node in nodes:
+                item = PushItem(node.nodeid, tcw, node.src)
+                if skip_unchanged and is_unchanged(node, tcw):
+                    result.unchanged.append(item)
+                else:
+                    result.items.append(item)
+        return result
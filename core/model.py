@@ -0,0 +1,75 @@
+import sys
+from typing import Any, List, Optional
+
+
+def intern_source(name: Any) -> str:
+    """Название источника, общее для всех его объектов учёта
+
+    Разбор JSON создаёт отдельную строку на каждый атрибут, а у одного
+    источника бывают сотни объектов учёта.
+    """
+    return sys.intern(str(name))
+
+
+def node_id(value: Any) -> Any:
+    """Идентификатор объекта учёта как int, если он числовой"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class SourceNode:
+    """Объект учёта с атрибутом sourceName и текущими значениями Тхв"""
+
+    __slots__ = ("src", "nodeid", "summer", "winter")
+
+    def __init__(
+        self,
+        src: Any,
+        nodeid: Any,
+        summer: Optional[float] = None,
+        winter: Optional[float] = None
+    ):
+        self.src = intern_source(src)
+        self.nodeid = node_id(nodeid)
+        self.summer = summer
+        self.winter = winter
+
+    @classmethod
+    def from_row(cls, row: List[Any]) -> "SourceNode":
+        return cls(*row)
+
+    def to_row(self) -> List[Any]:
+        """Компактное представление для кэша на диске"""
+        return [self.src, self.nodeid, self.summer, self.winter]
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SourceNode) and self.to_row() == other.to_row()
+
+    def __repr__(self) -> str:
+        return f"SourceNode({self.src!r}, {self.nodeid!r}, {self.summer!r}, {self.winter!r})"
+
+
+class PushItem:
+    """Значение Тхв для записи в один объект учёта"""
+
+    __slots__ = ("nodeid", "tcw", "src", "profile")
+
+    def __init__(self, nodeid: Any, tcw: Any, src: str = "", profile: Optional[str] = None):
+        self.nodeid = nodeid
+        self.tcw = tcw
+        self.src = src
+        # Имя сервера при записи на несколько серверов
+        self.profile = profile
+
+    def with_profile(self, profile: str) -> "PushItem":
+        return PushItem(self.nodeid, self.tcw, self.src, profile)
+
+    def __eq__(self, other: Any) -> bool:
+        return (isinstance(other, PushItem) and
+                (self.nodeid, self.tcw, self.src, self.profile) ==
+                (other.nodeid, other.tcw, other.src, other.profile))
+
+    def __repr__(self) -> str:
+        return f"PushItem({self.nodeid!r}, {self.tcw!r}, {self.src!r}, {self.profile!r})"
@@ -0,0 +1,136 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List
+from config.settings import PUSH_OUTBOX_FILE
+from core.model import PushItem
+
+
+class PushOutbox:
+    """Очередь значений, не записанных из-за недоступности сервера
+
+    Файл дописывается, как журнал записи: первая строка - заголовок
+    с сервером, далее [nodeid, tcw, src] на каждое поставленное в очередь
+    значение и [nodeid, tcw] на каждое отправленное. При чтении для объекта
+    учёта остаётся только последнее значение. Очередь другого сервера
+    не отправляется и заменяется при первой постановке в очередь.
+    """
+
+    def __init__(self, path: str = PUSH_OUTBOX_FILE):
+        self.path = path
+        self._server = None
+        self._items: Dict[Any, PushItem] = {}
+        self._lines = 0
+
+    def _load(self, server: str):
+        if self._server == server:
+            return
+        self._server = server
+        self._items = {}
+        self._lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline())
+                if header.get("server") != server:
+                    return
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Строка, оборванная при аварийном завершении
+                        continue
+                    self._lines += 1
+                    self._apply(entry)
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, AttributeError, OSError):
+            pass
+
+    def _apply(self, entry: List[Any]):
+        if len(entry) == 3:
+            node_id, tcw, src = entry
+            self._items[node_id] = PushItem(node_id, tcw, src)
+        else:
+            node_id, tcw = entry
+            item = self._items.get(node_id)
+            # Более новое значение остаётся в очереди
+            if item is not None and (tcw is None or float(item.tcw) == tcw):
+                del self._items[node_id]
+
+    def _append(self, server: str, entries: List[List[Any]]):
+        if not entries:
+            return
+        try:
+            if self._lines == 0:
+                with open(self.path, "w", encoding="utf-8") as file:
+                    file.write(json.dumps({"server": server}) + "\n")
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write("".join(
+                    json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            self._lines += len(entries)
+        except OSError:
+            pass
+
+    def pending(self, server: str) -> List[PushItem]:
+        """Значения в очереди, по одному на объект учёта"""
+        self._load(server)
+        return list(self._items.values())
+
+    def put(self, server: str, items: Iterable[PushItem]):
+        """Постановка в очередь; прежнее значение объекта учёта заменяется"""
+        self._load(server)
+        entries = []
+        for item in items:
+            tcw = float(item.tcw)
+            self._items[item.nodeid] = PushItem(item.nodeid, tcw, item.src)
+            entries.append([item.nodeid, tcw, item.src])
+        self._append(server, entries)
+
+    def discard(self, server: str, items: Iterable[PushItem], any_value: bool = False):
+        """Снятие записанных значений; any_value - снять объект учёта целиком
+
+        Запись нового значения напрямую делает значение из очереди
+        устаревшим, поэтому оно снимается независимо от tcw.
+        """
+        self._load(server)
+        entries = []
+        for item in items:
+            queued = self._items.get(item.nodeid)
+            if queued is None:
+                continue
+            tcw = None if any_value else float(item.tcw)
+            if tcw is None or float(queued.tcw) == tcw:
+                del self._items[item.nodeid]
+                entries.append([item.nodeid, tcw])
+        if not entries:
+            return
+        if not self._items:
+            self._clear()
+        else:
+            self._append(server, entries)
+            if self._lines > 2 * len(self._items) + 100:
+                self._compact(server)
+
+    def _clear(self):
+        if self._lines == 0:
+            # Файл пуст или принадлежит другому серверу
+            return
+        self._lines = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            pass
+
+    def _compact(self, server: str):
+        """Перезапись файла без отправленных и заменённых значений"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"server": server}) + "\n")
+                for item in self._items.values():
+                    file.write(json.dumps([item.nodeid, item.tcw, item.src], ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._lines = len(self._items)
+        except OSError:
+            pass
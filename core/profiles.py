@@ -0,0 +1,32 @@
+import hashlib
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class ServerProfile:
+    """Сервер ЛЭРС УЧЁТ с учётными данными"""
+    name: str
+    server: str
+    login: str
+    password: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ServerProfile":
+        return cls(
+            name=data.get("name") or data["server"],
+            server=data["server"],
+            login=data["login"],
+            password=data["password"]
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
+
+
+def profile_path(base: str, profile: ServerProfile) -> str:
+    """Отдельный файл кэша или журнала для дополнительного сервера"""
+    key = hashlib.sha1(f"{profile.server}|{profile.login}".encode()).hexdigest()[:10]
+    root, ext = os.path.splitext(base)
+    return f"{root}_{key}{ext}"
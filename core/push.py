@@ -0,0 +1,388 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, List, Optional, Union
+from config.settings import (
+    PUSH_MIN_CONCURRENCY,
+    PUSH_INITIAL_CONCURRENCY,
+    PUSH_MAX_CONCURRENCY,
+    PUSH_LATENCY_TARGET,
+    PUSH_RETRY_ATTEMPTS,
+    PUSH_RETRY_BASE_DELAY,
+    PUSH_RETRY_MAX_DELAY,
+    PUSH_UNREACHABLE_ATTEMPTS,
+    PUSH_PROGRESS_INTERVAL
+)
+from core.model import PushItem
+
+# Коды ответа, которыми сервер просит снизить нагрузку
+THROTTLE_STATUSES = (429, 503)
+
+
+@dataclass
+class PushItemResult:
+    """Результат записи одного объекта учёта"""
+    item: PushItem
+    success: bool
+    status: Optional[int] = None
+    latency: float = 0.0
+    retry_after: Optional[float] = None
+    error: Optional[str] = None
+    attempts: int = 1
+    skipped: bool = False
+    # Соединение с сервером не установлено (отказ, DNS)
+    connect_failed: bool = False
+
+    @property
+    def throttled(self) -> bool:
+        return self.status in THROTTLE_STATUSES
+
+    @property
+    def transient(self) -> bool:
+        """Ошибка, после которой запрос имеет смысл повторить"""
+        if self.success:
+            return False
+        # Нет статуса - таймаут или обрыв соединения
+        return self.status is None or self.throttled or self.status >= 500
+
+    @property
+    def unanswered(self) -> bool:
+        """Сервер не ответил: соединение не установлено, оборвано или таймаут"""
+        return not self.success and self.status is None and self.error != "cancelled"
+
+
+@dataclass
+class PushReport:
+    """Итог записи: результаты по каждому объекту учёта"""
+    results: List[PushItemResult] = field(default_factory=list)
+    cancelled: bool = False
+    # Не записанные из-за недоступности сервера и поставленные в очередь
+    queued: List[PushItem] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[PushItemResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> List[PushItemResult]:
+        return [r for r in self.results if not r.success]
+
+    @property
+    def written(self) -> List[PushItemResult]:
+        """Объекты, записанные в этом запуске"""
+        return [r for r in self.results if r.success and not r.skipped]
+
+    def __bool__(self) -> bool:
+        return not self.failed and not self.cancelled
+
+
+@dataclass
+class PushProgress:
+    """Ход записи: сколько обработано, скорость и оставшееся время"""
+    total: int
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def add(self, result: PushItemResult):
+        if result.success:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    @property
+    def processed(self) -> int:
+        return self.done + self.failed
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.processed)
+
+    @property
+    def fraction(self) -> float:
+        return self.processed / self.total if self.total else 1.0
+
+    @property
+    def rate(self) -> float:
+        """Объектов учёта в секунду без учёта записанных ранее"""
+        elapsed = time.monotonic() - self.started
+        sent = self.processed - self.skipped
+        return sent / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Оставшееся время в секундах, пока скорость неизвестна - None"""
+        rate = self.rate
+        if not rate:
+            return None
+        return self.remaining / rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовка Retry-After (секунды или HTTP-дата)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Повтор временных ошибок с экспоненциальной задержкой и джиттером"""
+
+    def __init__(
+        self,
+        attempts: int = PUSH_RETRY_ATTEMPTS,
+        base_delay: float = PUSH_RETRY_BASE_DELAY,
+        max_delay: float = PUSH_RETRY_MAX_DELAY
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, result: PushItemResult) -> bool:
+        return result.transient and result.attempts < self.attempts
+
+    def delay(self, result: PushItemResult) -> float:
+        if result.throttled and result.retry_after is not None:
+            # Паузу по Retry-After выдерживает AdaptiveLimiter
+            return 0.0
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (result.attempts - 1))
+        return random.uniform(0, ceiling)
+
+
+class AdaptiveLimiter:
+    """AIMD-регулятор числа одновременных запросов"""
+
+    def __init__(
+        self,
+        initial: int = PUSH_INITIAL_CONCURRENCY,
+        minimum: int = PUSH_MIN_CONCURRENCY,
+        maximum: int = PUSH_MAX_CONCURRENCY,
+        latency_target: float = PUSH_LATENCY_TARGET
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.window = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, int(self.window))
+
+    async def acquire(self):
+        """Ожидание свободного места в окне"""
+        while True:
+            async with self._condition:
+                delay = self._paused_until - time.monotonic()
+                if delay <= 0:
+                    if self._in_flight < self.limit:
+                        self._in_flight += 1
+                        return
+                    await self._condition.wait()
+                    continue
+            await asyncio.sleep(delay)
+
+    async def release(self, result: PushItemResult):
+        """Освобождение места и подстройка окна по ответу сервера"""
+        async with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if result.throttled:
+                # Общая пауза - только по явной просьбе сервера, одиночный
+                # 503 без Retry-After лишь сужает окно
+                if result.retry_after is not None:
+                    self._paused_until = max(self._paused_until, now + result.retry_after)
+                self._decrease(now)
+            elif result.latency > self.latency_target:
+                self._decrease(now)
+            elif result.success:
+                # Аддитивный рост: примерно +1 за окно успешных ответов
+                self.window = min(self.maximum, self.window + 1 / self.window)
+            self._condition.notify_all()
+
+    def _decrease(self, now: float):
+        # Ответы одного окна приходят пачкой, уменьшаем не чаще раза за окно
+        if now - self._last_decrease < self.latency_target:
+            return
+        self._last_decrease = now
+        self.window = max(float(self.minimum), self.window / 2)
+
+
+class PushEngine:
+    """Запись объектов учёта через пул обработчиков с адаптивным окном
+
+    send получает пачку до batch_size объектов (один запрос транспорта)
+    и возвращает результат по каждому объекту пачки. cancel() вызывается
+    из того же цикла событий: запросы в полёте отменяются, а run()
+    возвращает отчёт, где неотправленные объекты помечены "cancelled".
+    Отказ в соединении или PUSH_UNREACHABLE_ATTEMPTS попыток пачки подряд
+    без ответа (сервер недоступен) останавливают запись: повторы и новые
+    пачки не отправляются, а неотправленные объекты помечаются
+    "server unreachable". Одиночный таймаут или обрыв соединения
+    повторяется по RetryPolicy.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[PushItem]], Awaitable[List[PushItemResult]]],
+        limiter: Optional[AdaptiveLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        max_workers: int = PUSH_MAX_CONCURRENCY,
+        on_result: Optional[Callable[[PushItemResult], None]] = None,
+        batch_size: Union[int, Callable[[], int]] = 1,
+        on_progress: Optional[Callable[[PushProgress], None]] = None,
+        progress_interval: float = PUSH_PROGRESS_INTERVAL,
+        unreachable_attempts: int = PUSH_UNREACHABLE_ATTEMPTS
+    ):
+        self.send = send
+        self.limiter = limiter or AdaptiveLimiter(maximum=max_workers)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.max_workers = max_workers
+        self.on_result = on_result
+        # Функция - если размер пачки меняется по ходу записи
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.cancelled = False
+        self.unreachable = False
+        self.unreachable_attempts = unreachable_attempts
+        self._workers: List[asyncio.Task] = []
+        self._last_progress = 0.0
+
+    def cancel(self):
+        """Остановка записи: новые пачки не берутся, текущие отменяются"""
+        self.cancelled = True
+        for task in self._workers:
+            task.cancel()
+
+    def _next_batch_size(self) -> int:
+        size = self.batch_size() if callable(self.batch_size) else self.batch_size
+        return max(1, size)
+
+    def _emit_progress(self, progress: PushProgress, force: bool = False):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        # Не чаще progress_interval, чтобы не заваливать интерфейс событиями
+        if force or now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            self.on_progress(progress)
+
+    async def _send_once(self, batch: List[PushItem]) -> List[PushItemResult]:
+        await self.limiter.acquire()
+        results = [PushItemResult(item, False, error="cancelled") for item in batch]
+        try:
+            results = await self.send(batch)
+        finally:
+            # Место в окне освобождается даже при отмене;
+            # окно подстраивается по худшему ответу пачки
+            feedback = next((r for r in results if r.throttled), results[0])
+            await self.limiter.release(feedback)
+        return results
+
+    async def _send_with_retry(
+        self,
+        batch: List[PushItem],
+        emit: Callable[[PushItemResult], None]
+    ):
+        """Отправка пачки с повторами; итог по объекту передаётся в emit сразу
+
+        Итог попытки не ждёт конца повторов: при отмене во время паузы или
+        следующей попытки уже записанные объекты остаются в отчёте.
+        """
+        attempt = 1
+        # Попыток подряд, на которые сервер не ответил
+        unanswered = 0
+        while batch:
+            retry = []
+            results = await self._send_once(batch)
+            if any(r.connect_failed for r in results):
+                self.unreachable = True
+            elif any(r.status is not None for r in results):
+                unanswered = 0
+            elif any(r.unanswered for r in results):
+                unanswered += 1
+                if unanswered >= self.unreachable_attempts:
+                    self.unreachable = True
+            for result in results:
+                result.attempts = attempt
+                if not self.unreachable and self.retry_policy.should_retry(result):
+                    retry.append(result)
+                else:
+                    emit(result)
+            if not retry:
+                break
+            await asyncio.sleep(max(self.retry_policy.delay(r) for r in retry))
+            if self.unreachable:
+                # Сервер пропал, пока другой обработчик ждал повтора
+                for result in retry:
+                    emit(result)
+                break
+            batch = [r.item for r in retry]
+            attempt += 1
+
+    async def run(
+        self,
+        items: List[PushItem],
+        progress: Optional[PushProgress] = None
+    ) -> PushReport:
+        report = PushReport()
+        if progress is None:
+            progress = PushProgress(total=len(items))
+        # Пачки набираются при выборке: их размер может уменьшиться по ходу
+        pending = deque(items)
+
+        def emit(result: PushItemResult):
+            report.results.append(result)
+            progress.add(result)
+            if self.on_result:
+                self.on_result(result)
+
+        async def worker():
+            while not (self.cancelled or self.unreachable):
+                if not pending:
+                    return
+                size = min(self._next_batch_size(), len(pending))
+                batch = [pending.popleft() for _ in range(size)]
+                await self._send_with_retry(batch, emit)
+                self._emit_progress(progress)
+
+        self._emit_progress(progress, force=True)
+        self._workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(self.max_workers, len(items)))
+        ]
+        try:
+            # Отмена всего run() пробрасывается, отмена через cancel() - нет
+            outcomes = await asyncio.gather(*self._workers, return_exceptions=True)
+        finally:
+            for task in self._workers:
+                task.cancel()
+            self._workers = []
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+
+        if self.cancelled or self.unreachable:
+            report.cancelled = self.cancelled
+            error = "cancelled" if self.cancelled else "server unreachable"
+            reported = {id(r.item) for r in report.results}
+            for item in items:
+                if id(item) not in reported:
+                    report.results.append(PushItemResult(item, False, error=error))
+        self._emit_progress(progress, force=True)
+        return report
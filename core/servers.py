@@ -0,0 +1,222 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from config.settings import NODES_CACHE_FILE, PUSH_JOURNAL_FILE, PUSH_OUTBOX_FILE
+from core.api import ApiManager
+from core.auth import AuthManager
+from core.cache import NodeCache
+from core.http import HttpPool
+from core.journal import PushJournal
+from core.merge import MergeResult, normalize_source_name
+from core.outbox import PushOutbox
+from core.model import PushItem, SourceNode
+from core.profiles import ServerProfile, profile_path
+from core.push import PushItemResult, PushProgress, PushReport
+
+
+def create_api_manager(profile: ServerProfile) -> ApiManager:
+    """ApiManager дополнительного сервера: свои ключ, пул, кэш и журнал"""
+    auth_manager = AuthManager(HttpPool())
+    auth_manager.server = profile.server
+    auth_manager.login = profile.login
+    auth_manager.password = profile.password
+    return ApiManager(
+        auth_manager,
+        journal=PushJournal(profile_path(PUSH_JOURNAL_FILE, profile)),
+        node_cache=NodeCache(profile_path(NODES_CACHE_FILE, profile)),
+        outbox=PushOutbox(profile_path(PUSH_OUTBOX_FILE, profile))
+    )
+
+
+@dataclass
+class GroupPlan(MergeResult):
+    """Сопоставление для нескольких серверов; None - сервер недоступен"""
+    servers: Dict[str, Optional[MergeResult]] = field(default_factory=dict)
+
+
+@dataclass
+class GroupReport(PushReport):
+    """Итог записи на несколько серверов с отчётом по каждому"""
+    servers: Dict[str, PushReport] = field(default_factory=dict)
+
+
+class ServerGroup:
+    """Одновременная работа с несколькими серверами ЛЭРС УЧЁТ
+
+    Повторяет интерфейс ApiManager, которым пользуются окно и пакетный
+    режим: источники объединяются, а загрузка, сопоставление и запись идут
+    на все серверы параллельно, так что общее время равно времени самого
+    медленного сервера.
+    """
+
+    def __init__(self, managers: Dict[str, ApiManager], primary: Optional[ApiManager] = None):
+        self.managers = managers
+        # Пул основного сервера общий с окном, группа его не закрывает
+        self.primary = primary
+        self.auth_manager = next(iter(managers.values())).auth_manager
+
+    @classmethod
+    def from_auth(
+        cls,
+        primary: ApiManager,
+        previous: Optional["ServerGroup"] = None
+    ) -> "ServerGroup":
+        """Основной сервер и дополнительные профили из учётных данных
+
+        Серверы previous с прежними учётными данными переходят в новую
+        группу вместе с пулом и ключом: идущая на них запись не прерывается.
+        """
+        auth_manager = primary.auth_manager
+        managers = {auth_manager.server: primary}
+        reused = previous.managers if previous is not None else {}
+        for profile in auth_manager.profiles:
+            api_manager = reused.get(profile.name)
+            if api_manager is None or not same_credentials(api_manager, profile):
+                api_manager = create_api_manager(profile)
+            managers.setdefault(profile.name, api_manager)
+        return cls(managers, primary)
+
+    async def _gather(self, call: Callable[[ApiManager], Any]) -> Dict[str, Any]:
+        names = list(self.managers)
+        results = await asyncio.gather(*(call(self.managers[name]) for name in names))
+        return dict(zip(names, results))
+
+    @property
+    def offline(self) -> bool:
+        """Хотя бы один сервер недоступен и его объекты учёта взяты из кэша"""
+        return any(api_manager.offline for api_manager in self.managers.values())
+
+    def invalidate_cache(self):
+        for api_manager in self.managers.values():
+            api_manager.invalidate_cache()
+
+    async def get_source_nodes_by_server(
+        self,
+        force_refresh: bool = False
+    ) -> Dict[str, Optional[List[SourceNode]]]:
+        return await self._gather(lambda api: api.get_source_nodes(force_refresh))
+
+    async def get_source_nodes(self, force_refresh: bool = False) -> Optional[List[SourceNode]]:
+        """Объекты учёта всех доступных серверов"""
+        by_server = await self.get_source_nodes_by_server(force_refresh)
+        if all(nodes is None for nodes in by_server.values()):
+            return None
+        return [node for nodes in by_server.values() for node in nodes or []]
+
+    async def get_sources_names(self, force_refresh: bool = False) -> List[str]:
+        by_server = await self._gather(lambda api: api.get_sources_names(force_refresh))
+        names = {}
+        for server_names in by_server.values():
+            for name in server_names:
+                # Одинаковые источники на разных серверах показываются один раз
+                names.setdefault(normalize_source_name(name), name)
+        return sorted(names.values())
+
+    async def plan_push(
+        self,
+        temp_data: Iterable[Dict[str, Any]],
+        skip_unchanged: bool = True
+    ) -> Optional[GroupPlan]:
+        # Поток записей из файла нужен каждому серверу
+        temp_data = list(temp_data)
+        plans = await self._gather(lambda api: api.plan_push(temp_data, skip_unchanged))
+        available = {name: plan for name, plan in plans.items() if plan is not None}
+        if not available:
+            return None
+
+        group = GroupPlan(servers=plans)
+        for name, plan in available.items():
+            group.items.extend(item.with_profile(name) for item in plan.items)
+            group.unchanged.extend(item.with_profile(name) for item in plan.unchanged)
+            group.unmatched_nodes.extend(plan.unmatched_nodes)
+        # Источник не найден, только если его нет ни на одном сервере
+        unmatched = [set(map(normalize_source_name, plan.unmatched_sources))
+                     for plan in available.values()]
+        common = set.intersection(*unmatched)
+        first = next(iter(available.values()))
+        group.unmatched_sources = [
+            src for src in first.unmatched_sources
+            if normalize_source_name(src) in common
+        ]
+        return group
+
+    def cancel_push(self):
+        for api_manager in self.managers.values():
+            api_manager.cancel_push()
+
+    async def push_temperature_data(
+        self,
+        data: List[PushItem],
+        on_progress: Optional[Callable[[PushProgress], None]] = None
+    ) -> GroupReport:
+        batches: Dict[str, List[PushItem]] = {name: [] for name in self.managers}
+        unknown = []
+        for item in data:
+            if item.profile in batches:
+                batches[item.profile].append(item)
+            else:
+                unknown.append(item)
+
+        progress: Dict[str, PushProgress] = {}
+
+        def server_progress(name: str):
+            def callback(server: PushProgress):
+                progress[name] = server
+                if on_progress is not None:
+                    on_progress(combine_progress(progress.values(), len(data)))
+            return callback
+
+        names = [name for name, items in batches.items() if items]
+        reports = await asyncio.gather(*(
+            self.managers[name].push_temperature_data(batches[name], server_progress(name))
+            for name in names
+        ))
+
+        report = GroupReport(servers=dict(zip(names, reports)))
+        for server_report in reports:
+            report.results.extend(server_report.results)
+            report.queued.extend(server_report.queued)
+            report.cancelled = report.cancelled or server_report.cancelled
+        report.results.extend(
+            PushItemResult(item, False, error="unknown server") for item in unknown)
+        return report
+
+    async def flush_outbox(self) -> Optional[GroupReport]:
+        """Отправка очередей всех серверов, которые снова доступны"""
+        reports = await self._gather(lambda api: api.flush_outbox())
+        reports = {name: report for name, report in reports.items() if report is not None}
+        if not reports:
+            return None
+        report = GroupReport(servers=reports)
+        for server_report in reports.values():
+            report.results.extend(server_report.results)
+        return report
+
+    async def close_session(self, keep: Optional["ServerGroup"] = None):
+        """Закрытие пулов дополнительных серверов, кроме перешедших в keep"""
+        kept = list(keep.managers.values()) if keep is not None else []
+        closing = [
+            api_manager for api_manager in self.managers.values()
+            if api_manager is not self.primary
+            and not any(api_manager is other for other in kept)
+        ]
+        await asyncio.gather(*(api.auth_manager.close_session() for api in closing))
+
+
+def same_credentials(api_manager: ApiManager, profile: ServerProfile) -> bool:
+    auth_manager = api_manager.auth_manager
+    return (auth_manager.server, auth_manager.login, auth_manager.password) == (
+        profile.server, profile.login, profile.password)
+
+
+def combine_progress(parts, total: int) -> PushProgress:
+    """Суммарный ход записи по нескольким серверам"""
+    parts = list(parts)
+    combined = PushProgress(total=total)
+    for part in parts:
+        combined.done += part.done
+        combined.failed += part.failed
+        combined.skipped += part.skipped
+    if parts:
+        combined.started = min(part.started for part in parts)
+    return combined
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+import aiohttp
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import (
+    API_NODES_ENDPOINT,
+    API_NODES_BULK_ENDPOINT,
+    PUSH_BATCH_SIZE,
+    PUSH_REQUEST_TIMEOUT
+)
+from core.model import PushItem, node_id
+from core.push import PushItemResult, parse_retry_after
+from utils import metrics
+
+# Ответы, по которым сервер не поддерживает пакетную запись
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+def temperature_patch(tcw: Any) -> List[Dict[str, Any]]:
+    """JSON Patch с летней и зимней температурой холодной воды"""
+    value = float(tcw)
+    return [
+        {
+            "op": "replace",
+            "value": value,
+            "path": "coldWaterSummerTemp"
+        },
+        {
+            "op": "replace",
+            "value": value,
+            "path": "coldWaterWinterTemp"
+        }
+    ]
+
+
+class PatchTransport(ABC):
+    """Способ доставки JSON Patch на сервер"""
+
+    batch_size = 1
+
+    def __init__(self, auth_manager):
+        self.auth_manager = auth_manager
+
+    @abstractmethod
+    async def send(
+        self,
+        session: aiohttp.ClientSession,
+        items: List[PushItem]
+    ) -> List[PushItemResult]:
+        """Запись пачки, результат по каждому объекту учёта"""
+
+    async def _request(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        body: Any = None,
+        content_type: str = 'application/json'
+    ) -> Tuple[int, Any, bytes, Optional[str]]:
+        """Запрос с API ключом и одним повторным входом при ответе 401"""
+        timeout = aiohttp.ClientTimeout(total=PUSH_REQUEST_TIMEOUT)
+        # Ключ берётся на каждый запрос: во время записи его могут обновить
+        api_key = await self.auth_manager.get_api_key()
+        for _ in range(2):
+            if not api_key:
+                break
+            headers = {
+                'Content-Type': content_type,
+                'Authorization': f'Bearer {api_key}'
+            }
+            async with session.request(
+                method, url, headers=headers, json=body, timeout=timeout
+            ) as response:
+                # Дочитываем тело, чтобы соединение вернулось в пул
+                payload = await response.read()
+                if response.status == 401:
+                    api_key = await self.auth_manager.refresh_api_key(api_key)
+                    continue
+                return response.status, response.headers, payload, response.reason
+        return 401, {}, b"", "authorization failed"
+
+
+class NodePatchTransport(PatchTransport):
+    """Отдельный PATCH на каждый объект учёта по keep-alive соединениям пула"""
+
+    async def send(
+        self,
+        session: aiohttp.ClientSession,
+        items: List[PushItem]
+    ) -> List[PushItemResult]:
+        # Запросы пачки идут конвейером по свободным соединениям пула
+        return list(await asyncio.gather(
+            *(self.send_item(session, item) for item in items)
+        ))
+
+    async def send_item(
+        self,
+        session: aiohttp.ClientSession,
+        item: PushItem
+    ) -> PushItemResult:
+        started = time.monotonic()
+        try:
+            url = f"{self.auth_manager.server}{API_NODES_ENDPOINT}/{item.nodeid}"
+            status, headers, _, reason = await self._request(
+                session, 'PATCH', url,
+                temperature_patch(item.tcw),
+                'application/json-patch+json'
+            )
+            ok = 200 <= status < 300
+            latency = time.monotonic() - started
+            metrics.record("patch", latency, node=item.nodeid, status=status)
+            return PushItemResult(
+                item,
+                ok,
+                status=status,
+                latency=latency,
+                retry_after=parse_retry_after(headers.get('Retry-After')),
+                error=None if ok else reason
+            )
+        except Exception as e:
+            latency = time.monotonic() - started
+            metrics.record("patch", latency, node=item.nodeid, error=type(e).__name__)
+            return PushItemResult(
+                item,
+                False,
+                latency=latency,
+                error=str(e) or type(e).__name__,
+                connect_failed=isinstance(e, aiohttp.ClientConnectorError)
+            )
+
+
+class BulkPatchTransport(PatchTransport):
+    """Пакетная запись: операции для многих объектов учёта в одном запросе"""
+
+    def __init__(self, auth_manager):
+        super().__init__(auth_manager)
+        self.fallback = NodePatchTransport(auth_manager)
+        self.supported = True
+
+    @property
+    def batch_size(self) -> int:
+        # После перехода на отдельные PATCH пачки из одного объекта
+        return PUSH_BATCH_SIZE if self.supported else 1
+
+    async def send(
+        self,
+        session: aiohttp.ClientSession,
+        items: List[PushItem]
+    ) -> List[PushItemResult]:
+        if not self.supported:
+            return await self._send_each(session, items)
+
+        started = time.monotonic()
+        body = [
+            {"id": item.nodeid, "patch": temperature_patch(item.tcw)}
+            for item in items
+        ]
+        try:
+            url = f"{self.auth_manager.server}{API_NODES_BULK_ENDPOINT}"
+            status, headers, payload, reason = await self._request(
+                session, 'PATCH', url, body)
+        except Exception as e:
+            latency = time.monotonic() - started
+            metrics.record("patch.bulk", latency, nodes=len(items), error=type(e).__name__)
+            return [
+                PushItemResult(
+                    item, False,
+                    latency=latency,
+                    error=str(e) or type(e).__name__,
+                    connect_failed=isinstance(e, aiohttp.ClientConnectorError)
+                )
+                for item in items
+            ]
+
+        if status in UNSUPPORTED_STATUSES:
+            # Пакетная запись недоступна - дальше только отдельные PATCH
+            self.supported = False
+            return await self._send_each(session, items)
+
+        ok = 200 <= status < 300
+        statuses = self._parse_statuses(payload) if ok else {}
+        latency = time.monotonic() - started
+        metrics.record("patch.bulk", latency, nodes=len(items), status=status)
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        results = []
+        for item in items:
+            item_status = statuses.get(item.nodeid, status)
+            item_ok = 200 <= item_status < 300
+            results.append(PushItemResult(
+                item,
+                item_ok,
+                status=item_status,
+                latency=latency,
+                retry_after=retry_after,
+                error=None if item_ok else reason
+            ))
+        return results
+
+    async def _send_each(
+        self,
+        session: aiohttp.ClientSession,
+        items: List[PushItem]
+    ) -> List[PushItemResult]:
+        # Пачка занимает одно место в окне регулятора, поэтому объекты,
+        # набранные до перехода на отдельные PATCH, идут по одному
+        return [await self.fallback.send_item(session, item) for item in items]
+
+    @staticmethod
+    def _parse_statuses(payload: bytes) -> Dict[Any, int]:
+        """Статусы по объектам учёта, если сервер их вернул"""
+        try:
+            data = json.loads(payload) if payload else None
+        except ValueError:
+            return {}
+        if isinstance(data, dict):
+            data = data.get("results")
+        if not isinstance(data, list):
+            return {}
+        return {
+            node_id(entry["id"]): int(entry["status"])
+            for entry in data
+            if isinstance(entry, dict) and "id" in entry and "status" in entry
+        }
+
+
+async def probe_transport(auth_manager, session: aiohttp.ClientSession) -> PatchTransport:
+    """Выбор транспорта по возможностям сервера"""
+    if not API_NODES_BULK_ENDPOINT:
+        return NodePatchTransport(auth_manager)
+    transport = BulkPatchTransport(auth_manager)
+    try:
+        url = f"{auth_manager.server}{API_NODES_BULK_ENDPOINT}"
+        status, headers, _, _ = await transport._request(session, 'OPTIONS', url)
+        if 200 <= status < 300 and 'PATCH' in headers.get('Allow', '').upper():
+            return transport
+    except Exception:
+        pass
+    return transport.fallback
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, Set
+
+
+class AsyncWorker:
+    """Постоянный фоновый цикл событий для всей асинхронной работы приложения"""
+
+    def __init__(self, name: str = "TcwImportLoop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._futures: Set[Future] = set()
+        # Один поток: обратные вызовы выполняются строго по очереди
+        self._callbacks = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{name}Callbacks")
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self.start()
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Запуск потока с циклом событий (повторный вызов ничего не делает)"""
+        if self.running:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(
+                        *pending, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    def submit(
+        self,
+        coro: Awaitable[Any],
+        on_done: Optional[Callable[[Future], None]] = None
+    ) -> Future:
+        """Запуск корутины в фоновом цикле из любого потока"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        if on_done is not None:
+            future.add_done_callback(
+                lambda done: self._callbacks.submit(on_done, done))
+        return future
+
+    def call_soon(self, callback: Callable[..., Any], *args):
+        """Вызов функции в фоновом цикле из любого потока"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def cancel(self, future: Future) -> bool:
+        """Отмена задачи, запущенной через submit"""
+        return future.cancel()
+
+    def cancel_all(self):
+        for future in list(self._futures):
+            future.cancel()
+
+    def stop(self, shutdown: Optional[Awaitable[Any]] = None, timeout: float = 5):
+        """Остановка цикла; shutdown - корутина, выполняемая перед остановкой"""
+        if not self.running:
+            return
+        self.cancel_all()
+        if shutdown is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(shutdown, self._loop).result(timeout)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._callbacks.shutdown(wait=False)
@@ -1,34 +1,56 @@
 import asyncio
-import threading
+import os
 import flet as ft
-from typing import List
+from concurrent.futures import Future
+from typing import Dict, List, Optional
 from config.settings import (
+    CREDENTIALS_FILE,
+    PUSH_OUTBOX_INTERVAL,
     WINDOW_WIDTH,
     WINDOW_HEIGHT,
     WINDOW_TITLE,
-    ICON_PATH
+    ICON_PATH,
+    SOURCE_ROW_HEIGHT,
+    WINDOW_CHROME_HEIGHT
 )
 from core.auth import AuthManager
 from core.api import ApiManager
-from gui.dialogs import create_settings_dialog, show_snack_bar
-from gui.validators import validate_number
-from utils.excel import export_to_excel, import_from_excel
+from core.http import HttpPool
+from core.merge import normalize_source_name
+from core.push import PushProgress
+from core.servers import ServerGroup
+from core.worker import AsyncWorker
+from gui.dialogs import create_settings_dialog, show_push_report, show_snack_bar
+from gui.source_list import SourceList
+from utils import metrics, startup
 from datetime import datetime
 
 
 class TcwImportApp:
     def __init__(self):
-        self.auth_manager = AuthManager()
-        self.api_manager = ApiManager(self.auth_manager)
-        self.sources = []
+        self.worker = AsyncWorker()
+        self.http_pool = HttpPool()
+        self.auth_manager = AuthManager(self.http_pool)
+        self.primary_api = ApiManager(self.auth_manager, self.http_pool)
+        self.api_manager = self.primary_api
+        self.source_list = None
+        self.push_button = None
+        self.push_panel = None
+        self.push_progress = None
+        self.push_status = None
+        self.cancel_button = None
         self.labels = []
+        self.label_index = {}
+        # Загрузка объектов учёта, начатая при запуске окна
+        self._nodes_prefetch: Optional[asyncio.Task] = None
+        self._outbox_task: Optional[Future] = None
         self.page = None
         self.file_picker = None
         self.save_file_dialog = None
 
-    def run_async(self, coro):
+    def run_async(self, coro, on_done=None):
         if coro is None:
-            return
+            return None
 
         async def wrapper():
             try:
@@ -36,45 +58,47 @@ class TcwImportApp:
             except Exception:
                 pass
 
-        def run():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(wrapper())
-            except Exception:
-                pass
-            finally:
-                try:
-                    pending = asyncio.all_tasks(loop)
-                    if pending:
-                        loop.run_until_complete(asyncio.gather(
-                            *pending, return_exceptions=True))
-                except Exception:
-                    pass
-                finally:
-                    try:
-                        loop.close()
-                    except Exception:
-                        pass
-
-        threading.Thread(target=run).start()
+        return self.worker.submit(wrapper(), on_done)
 
     def handle_file_picker_result(self, e: ft.FilePickerResultEvent):
         if e.files:
-            try:
-                data = import_from_excel(e.files[0].path)
-                for item in data:
-                    for i, label in enumerate(self.labels):
-                        if item['src'] == label:
-                            self.sources[i].value = str(item['tcw'])
-                            self.sources[i].update()
-                show_snack_bar(self.page, True)
-            except Exception:
-                show_snack_bar(self.page, False)
+            self.run_async(self.import_file_async(e.files[0].path))
+
+    def match_imported(self, data: List[dict]) -> Dict[str, str]:
+        """Значения из файла по названиям источников на форме"""
+        values = {}
+        for item in data:
+            i = self.label_index.get(normalize_source_name(item['src']))
+            if i is not None:
+                values[self.labels[i]] = str(item['tcw'])
+        return values
+
+    async def import_file_async(self, path: str):
+        progress = ft.ProgressBar()
+        self.page.overlay.append(progress)
+        self.page.update()
+
+        success = False
+        try:
+            # pandas загружается только при первом импорте из Excel
+            from utils.excel import import_from_excel
+            # Разбор файла в отдельном потоке, чтобы окно не замирало
+            data = await asyncio.to_thread(import_from_excel, path)
+            values = self.match_imported(data)
+            if self.source_list is not None:
+                self.source_list.set_values(values)
+            success = True
+        except Exception:
+            pass
+        finally:
+            self.page.overlay.remove(progress)
+            # Все значения и уведомление уходят клиенту одним обновлением
+            show_snack_bar(self.page, success)
 
     def handle_save_result(self, e: ft.FilePickerResultEvent):
         if e.path:
             try:
+                from utils.excel import export_to_excel
                 filepath = e.path if e.path.endswith(
                     '.xlsx') else f"{e.path}.xlsx"
                 export_to_excel(self.export_data_buffer, filepath)
@@ -85,10 +109,11 @@ class TcwImportApp:
     def export_data(self, _):
         try:
             data = []
-            for label, source in zip(self.labels, self.sources):
+            values = self.source_list.values if self.source_list else {}
+            for label in self.labels:
+                value = values.get(label)
                 try:
-                    temp = float(source.value.replace(",", ".")
-                                 ) if source.value else None
+                    temp = float(value.replace(",", ".")) if value else None
                 except (ValueError, AttributeError):
                     temp = None
 
@@ -150,49 +175,81 @@ class TcwImportApp:
         )
         page.overlay.append(self.save_file_dialog)
 
-    def grab_data(self) -> List[dict]:
-        data = [
-            [label, source.value.replace(",", ".")]
-            for label, source in zip(self.labels, self.sources)
-        ]
-        return [item for item in data if item[1]]
+    def grab_data(self) -> List[list]:
+        if self.source_list is None:
+            return []
+        return self.source_list.grab_data()
+
+    def on_push_progress(self, progress: PushProgress):
+        self.push_progress.value = progress.fraction
+        text = f"{progress.processed} из {progress.total}"
+        if progress.failed:
+            text += f", ошибок: {progress.failed}"
+        if progress.rate:
+            text += f", {progress.rate:.0f} об./с"
+        if progress.eta is not None and progress.remaining:
+            minutes, seconds = divmod(int(progress.eta), 60)
+            text += f", осталось {minutes}:{seconds:02d}"
+        self.push_status.value = text
+        self.push_panel.update()
+
+    def cancel_push(self, _):
+        self.cancel_button.disabled = True
+        self.cancel_button.update()
+        # Отмена выполняется в цикле событий, где идёт запись
+        self.worker.call_soon(self.api_manager.cancel_push)
+
+    def show_push_panel(self, visible: bool):
+        self.push_progress.value = None
+        self.push_status.value = ""
+        self.cancel_button.disabled = True
+        self.push_panel.visible = visible
+        self.push_button.disabled = visible or not self.labels
+        self.page.update()
 
     async def push_data_with_status_async(self, _):
-        progress = ft.ProgressBar()
-        self.page.overlay.append(progress)
-        self.page.update()
+        self.show_push_panel(True)
 
         try:
-            node_attributes = await self.api_manager.filter_node_attributes(self.labels)
-            if not node_attributes:
-                show_snack_bar(self.page, False)
-                return
-
-            node_data = [
-                dict(zip(['src', 'nodeid'], item))
-                for item in node_attributes
-            ]
             input_data = [
                 dict(zip(['src', 'tcw'], item))
                 for item in self.grab_data()
             ]
-
-            if not node_data or not input_data:
+            if not input_data:
                 show_snack_bar(self.page, False)
                 return
 
-            merged_data = self.api_manager.merge_data(node_data, input_data)
-            if not merged_data:
+            plan = await self.api_manager.plan_push(input_data)
+            if plan is None or not (plan.items or plan.unchanged):
                 show_snack_bar(self.page, False)
                 return
+            if not plan.items:
+                show_snack_bar(self.page, True, "Значения не изменились")
+                return
 
-            result = await self.api_manager.push_temperature_data(merged_data)
-            show_snack_bar(self.page, bool(result))
+            self.cancel_button.disabled = False
+            result = await self.api_manager.push_temperature_data(
+                plan.items, self.on_push_progress)
+            servers = getattr(plan, "servers", {})
+            if result.queued and not result.cancelled:
+                # Оператор не ждёт сервер: значения уйдут в фоне
+                show_snack_bar(
+                    self.page,
+                    False,
+                    f"Сервер недоступен, значений в очереди: {len(result.queued)}. "
+                    "Они будут записаны, когда связь восстановится"
+                )
+            elif result.cancelled:
+                show_push_report(self.page, result, servers)
+            elif servers and (not result or None in servers.values()):
+                # Итог по каждому серверу, если хотя бы на одном ошибка
+                show_push_report(self.page, result, servers, "Ошибка записи")
+            else:
+                show_snack_bar(self.page, bool(result))
         except Exception:
             show_snack_bar(self.page, False)
         finally:
-            self.page.overlay.remove(progress)
-            self.page.update()
+            self.show_push_panel(False)
 
     def push_data_with_status(self, e):
         self.run_async(self.push_data_with_status_async(e))
@@ -202,7 +259,138 @@ class TcwImportApp:
             return
         self.run_async(self.refresh_sources_async())
 
-    async def refresh_sources_async(self):
+    def reload_sources(self, _=None):
+        if self.page is None:
+            return
+        self.run_async(self.refresh_sources_async(force_refresh=True))
+
+    def configure_servers(self):
+        """Дополнительные серверы из настроек: загрузка и запись идут на все сразу"""
+        previous = self.api_manager
+        if not isinstance(previous, ServerGroup):
+            previous = None
+        if self.auth_manager.profiles:
+            self.api_manager = ServerGroup.from_auth(self.primary_api, previous)
+        else:
+            self.api_manager = self.primary_api
+        if previous is not None:
+            # Основной сервер и оставшиеся профили продолжают работу
+            keep = self.api_manager if isinstance(self.api_manager, ServerGroup) else None
+            self.run_async(previous.close_session(keep))
+
+    async def close_connections(self):
+        await self.auth_manager.close_session()
+        if isinstance(self.api_manager, ServerGroup):
+            await self.api_manager.close_session()
+
+    def on_credentials_saved(self, _=None):
+        self.configure_servers()
+        self.api_manager.invalidate_cache()
+        self.refresh_sources()
+        self.start_outbox()
+
+    def start_outbox(self):
+        """Фоновая отправка очереди значений (однократный запуск)"""
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = self.run_async(self.flush_outbox_loop())
+
+    async def flush_outbox_loop(self):
+        while True:
+            try:
+                report = await self.api_manager.flush_outbox()
+                if report is not None and report.written and self.page is not None:
+                    show_snack_bar(
+                        self.page,
+                        True,
+                        f"Записано значений из очереди: {len(report.written)}"
+                    )
+            except Exception:
+                pass
+            await asyncio.sleep(PUSH_OUTBOX_INTERVAL)
+
+    def build_layout(self):
+        """Однократное построение окна; дальше меняется только содержимое"""
+        self.source_list = SourceList()
+        self.push_progress = ft.ProgressBar(value=None)
+        self.push_status = ft.Text("", size=12, color=ft.colors.GREY_700)
+        self.cancel_button = ft.TextButton(
+            "Отмена",
+            on_click=self.cancel_push,
+            disabled=True
+        )
+        self.push_panel = ft.Column(
+            controls=[
+                self.push_progress,
+                ft.Row(
+                    controls=[
+                        ft.Container(content=self.push_status, expand=True),
+                        self.cancel_button
+                    ],
+                    tight=True
+                )
+            ],
+            spacing=2,
+            visible=False
+        )
+        self.push_button = ft.ElevatedButton(
+            "Записать значения Тхв",
+            icon=ft.icons.UPLOAD,
+            on_click=self.push_data_with_status,
+            disabled=True
+        )
+        button_row = ft.Row(
+            controls=[
+                ft.IconButton(
+                    icon=ft.icons.SETTINGS,
+                    icon_color=ft.colors.BLUE_400,
+                    tooltip="Настройки",
+                    on_click=create_settings_dialog(
+                        self.page,
+                        self.auth_manager,
+                        self.on_credentials_saved,
+                        self.run_async
+                    )
+                ),
+                ft.IconButton(
+                    icon=ft.icons.REFRESH,
+                    icon_color=ft.colors.BLUE_400,
+                    tooltip="Обновить список источников",
+                    on_click=self.reload_sources
+                ),
+                ft.IconButton(
+                    icon=ft.icons.FILE_UPLOAD,
+                    icon_color=ft.colors.BLUE_400,
+                    tooltip="Импорт из Excel",
+                    on_click=lambda _: self.file_picker.pick_files(
+                        allowed_extensions=['xlsx', 'csv', 'parquet']
+                    )
+                ),
+                ft.IconButton(
+                    icon=ft.icons.FILE_DOWNLOAD,
+                    icon_color=ft.colors.BLUE_400,
+                    tooltip="Экспорт в Excel",
+                    on_click=self.export_data
+                ),
+                ft.Container(
+                    expand=True,
+                    alignment=ft.alignment.center
+                ),
+                self.push_button
+            ],
+            spacing=0,
+            tight=True
+        )
+
+        self.page.clean()
+        self.page.add(
+            ft.Column(
+                controls=[self.source_list.control, self.push_panel, button_row],
+                spacing=8,
+                expand=True
+            )
+        )
+
+    async def refresh_sources_async(self, force_refresh: bool = False):
         if not self.page:
             return
 
@@ -211,161 +399,98 @@ class TcwImportApp:
         self.page.update()
 
         try:
-            sources = await self.api_manager.get_sources_names()
+            prefetch, self._nodes_prefetch = self._nodes_prefetch, None
+            if prefetch is not None and not force_refresh:
+                # Объекты учёта уже загружаются, результат попадёт в кэш
+                await asyncio.wait([prefetch])
+            sources = await self.api_manager.get_sources_names(force_refresh)
             if sources is None:
                 show_snack_bar(self.page, False)
                 return
+            if self.api_manager.offline:
+                show_snack_bar(
+                    self.page,
+                    False,
+                    "Сервер недоступен, источники из кэша. "
+                    "Значения будут записаны, когда связь восстановится"
+                )
 
             self.labels = sources if sources else []
-            self.sources = []
-
-            base_height = 500
-            item_height = 50
-            max_height = base_height * 3
-
-            desired_height = len(self.labels) * item_height
-            window_height = min(desired_height, max_height) if len(
-                self.labels) > 6 else base_height
-            self.page.window.height = window_height
-
-            content = ft.Column(
-                spacing=8,
-                tight=True,
-                height=window_height,
-                scroll=desired_height > max_height
-            )
-
-            button_row = ft.Row(
-                controls=[
-                    ft.IconButton(
-                        icon=ft.icons.SETTINGS,
-                        icon_color=ft.colors.BLUE_400,
-                        tooltip="Настройки",
-                        on_click=create_settings_dialog(
-                            self.page,
-                            self.auth_manager,
-                            self.refresh_sources
-                        )
-                    ),
-                    ft.IconButton(
-                        icon=ft.icons.FILE_UPLOAD,
-                        icon_color=ft.colors.BLUE_400,
-                        tooltip="Импорт из Excel",
-                        on_click=lambda _: self.file_picker.pick_files(
-                            allowed_extensions=['xlsx']
-                        )
-                    ),
-                    ft.IconButton(
-                        icon=ft.icons.FILE_DOWNLOAD,
-                        icon_color=ft.colors.BLUE_400,
-                        tooltip="Экспорт в Excel",
-                        on_click=self.export_data
-                    ),
-                    ft.Container(
-                        expand=True,
-                        alignment=ft.alignment.center
-                    ),
-                    ft.ElevatedButton(
-                        "Записать значения Тхв",
-                        icon=ft.icons.UPLOAD,
-                        on_click=self.push_data_with_status,
-                        disabled=not self.labels
-                    )
-                ],
-                spacing=0,
-                tight=True
-            )
-
-            if not self.labels:
-                content.controls.append(
-                    ft.Container(
-                        content=ft.Text(
-                            "Для работы приложения тебуется пользовательский "
-                            "атрибут Объекта Учёта 'sourceName' содержащий "
-                            "название источника",
-                            size=14,
-                            text_align=ft.TextAlign.CENTER,
-                            color=ft.colors.GREY_700,
-                            weight=ft.FontWeight.NORMAL,
-                            width=350
-                        ),
-                        alignment=ft.alignment.center,
-                        padding=ft.padding.only(top=20, bottom=20)
-                    )
+            self.label_index = {
+                normalize_source_name(label): i
+                for i, label in enumerate(self.labels)
+            }
+
+            if self.source_list is None:
+                self.build_layout()
+            self.source_list.set_labels(self.labels)
+            self.push_button.disabled = not self.labels
+
+            # Высота окна по числу строк на странице, а не всех источников
+            rows = min(len(self.labels), self.source_list.page_size)
+            window_height = WINDOW_HEIGHT
+            if rows > 6:
+                window_height = min(
+                    rows * SOURCE_ROW_HEIGHT + WINDOW_CHROME_HEIGHT,
+                    WINDOW_HEIGHT * 3
                 )
-            else:
-                for label in self.labels:
-                    row = ft.Row(
-                        controls=[
-                            ft.Text(label, size=14, width=250),
-                            ft.TextField(
-                                width=100,
-                                height=35,
-                                text_align=ft.TextAlign.CENTER,
-                                content_padding=ft.padding.only(
-                                    left=5, right=5, top=5),
-                                keyboard_type=ft.KeyboardType.NUMBER,
-                                border_color=ft.colors.GREY_300,
-                                focused_border_color=ft.colors.BLUE_400,
-                                on_change=validate_number
-                            )
-                        ],
-                        tight=True
-                    )
-                    content.controls.append(row)
-                    self.sources.append(row.controls[1])
-
-            content.controls.append(button_row)
+            self.page.window.height = window_height
 
-            self.page.clean()
-            self.page.add(content)
             self.page.update()
+            startup.finish("источники отображены")
         finally:
             self.page.overlay.remove(progress)
             self.page.update()
 
-    async def main_async(self, page: ft.Page):
-        try:
-            self.initialize_window(page)
-
-            if not self.auth_manager.load_credentials():
-                settings_dialog = create_settings_dialog(
-                    page,
-                    self.auth_manager,
-                    self.refresh_sources
-                )
-                settings_dialog(None)
-            else:
-                await self.refresh_sources_async()
-        except Exception:
-            show_snack_bar(page, False)
-
-    def main(self, page: ft.Page):
+    def start_prefetch(self) -> Future:
+        """Запуск подготовки к работе с сервером параллельно с построением окна"""
+        return self.worker.submit(self.prefetch_async())
+
+    async def prefetch_async(self) -> bool:
+        """Учётные данные, пул соединений, вход и загрузка объектов учёта
+
+        Возвращает, загружены ли учётные данные, сразу после расшифровки:
+        вход и загрузка продолжаются в фоне, их ждёт refresh_sources_async.
+        """
+        # Расшифровка (PBKDF2) идёт в потоке, цикл тем временем создаёт
+        # пул соединений и загружает сертификаты для TLS
+        loading = asyncio.create_task(asyncio.to_thread(self.auth_manager.load_credentials))
+        await self.http_pool.get_session()
+        if not await loading:
+            return False
+        self.configure_servers()
+        self._nodes_prefetch = asyncio.create_task(self.api_manager.get_source_nodes())
+        self.start_outbox()
+        return True
+
+    async def main(self, page: ft.Page):
         try:
+            # Расшифровка, вход и загрузка идут, пока строится окно
+            prefetch = self.start_prefetch()
             self.initialize_window(page)
+            if os.path.exists(CREDENTIALS_FILE):
+                self.build_layout()
+            self.page.update()
+            startup.mark("окно построено")
 
-            if not self.auth_manager.load_credentials():
+            # Ожидание без блокировки цикла событий Flet
+            if not await asyncio.wrap_future(prefetch):
                 settings_dialog = create_settings_dialog(
                     page,
                     self.auth_manager,
-                    self.refresh_sources
+                    self.on_credentials_saved,
+                    self.run_async
                 )
                 settings_dialog(None)
+                startup.finish("открыт диалог настроек")
             else:
-                content = ft.Column(
-                    spacing=8,
-                    tight=True,
-                    height=WINDOW_HEIGHT,
-                    scroll=False
-                )
-                self.page.add(content)
                 self.refresh_sources()
 
         except Exception:
             show_snack_bar(page, False)
 
     async def cleanup(self):
-        if hasattr(self, 'auth_manager'):
-            await self.auth_manager.close_session()
-        if hasattr(self, 'api_manager'):
-            await self.api_manager.close_session()
+        if hasattr(self, 'worker'):
+            # Пул соединений закрывается в том же цикле, где был создан
+            await asyncio.to_thread(self.worker.stop, self.close_connections())
+        metrics.finish()
@@ -1,10 +1,9 @@
-import asyncio
-import threading
 import flet as ft
+from core.profiles import ServerProfile
 from gui.validators import validate_server, validate_login, validate_password
 
 
-def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback):
+def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback, run_async):
     server_field = ft.TextField(
         label="сервер",
         value=auth_manager.server,
@@ -40,6 +39,115 @@ def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback):
     )
     progress = ft.ProgressBar(visible=False)
 
+    # Дополнительные серверы: запись и загрузка идут на все сразу
+    profiles_column = ft.Column(spacing=0)
+    profile_name_field = ft.TextField(
+        label="название",
+        border_color=ft.colors.GREY_300,
+        focused_border_color=ft.colors.BLUE_400,
+        width=300
+    )
+    profile_server_field = ft.TextField(
+        label="сервер",
+        hint_text="http://server или https://server",
+        border_color=ft.colors.GREY_300,
+        focused_border_color=ft.colors.BLUE_400,
+        width=300,
+        on_change=validate_server
+    )
+    profile_login_field = ft.TextField(
+        label="логин",
+        border_color=ft.colors.GREY_300,
+        focused_border_color=ft.colors.BLUE_400,
+        width=300,
+        on_change=validate_login
+    )
+    profile_password_field = ft.TextField(
+        label="пароль",
+        password=True,
+        can_reveal_password=True,
+        border_color=ft.colors.GREY_300,
+        focused_border_color=ft.colors.BLUE_400,
+        width=300,
+        on_change=validate_password
+    )
+    profile_error_text = ft.Text(
+        "",
+        color=ft.colors.RED_400,
+        size=14,
+        text_align=ft.TextAlign.CENTER
+    )
+
+    def render_profiles():
+        profiles_column.controls = [
+            ft.Row(
+                controls=[
+                    ft.Text(f"{profile.name} - {profile.server}", size=14, width=300),
+                    ft.IconButton(
+                        icon=ft.icons.DELETE_OUTLINE,
+                        icon_color=ft.colors.RED_400,
+                        tooltip="Удалить сервер",
+                        data=profile.name,
+                        on_click=remove_profile
+                    )
+                ],
+                tight=True
+            )
+            for profile in auth_manager.profiles
+        ] or [ft.Text("Нет дополнительных серверов", size=14, color=ft.colors.GREY_700)]
+
+    def remove_profile(event):
+        auth_manager.write_profiles([
+            profile for profile in auth_manager.profiles
+            if profile.name != event.control.data
+        ])
+        render_profiles()
+        page.update()
+        if on_save_callback:
+            on_save_callback(None)
+
+    async def async_add_profile():
+        profile = ServerProfile(
+            (profile_name_field.value or "").strip() or profile_server_field.value,
+            profile_server_field.value,
+            profile_login_field.value,
+            profile_password_field.value
+        )
+        if not auth_manager.server:
+            profile_error_text.value = "Сначала сохраните основной сервер"
+        elif not (profile.server and profile.login and profile.password):
+            profile_error_text.value = "Заполните сервер, логин и пароль"
+        elif profile.name == auth_manager.server:
+            profile_error_text.value = "Название совпадает с основным сервером"
+        if profile_error_text.value:
+            page.update()
+            return
+
+        progress.visible = True
+        page.update()
+        try:
+            if await auth_manager.test_credentials(profile.login, profile.password, profile.server):
+                auth_manager.write_profiles([
+                    p for p in auth_manager.profiles if p.name != profile.name
+                ] + [profile])
+                for field in (profile_name_field, profile_server_field,
+                              profile_login_field, profile_password_field):
+                    field.value = ""
+                render_profiles()
+                if on_save_callback:
+                    on_save_callback(None)
+            else:
+                profile_error_text.value = "Ошибка проверки данных"
+        except Exception:
+            profile_error_text.value = "Ошибка сохранения"
+        finally:
+            progress.visible = False
+            page.update()
+
+    def add_profile(_):
+        profile_error_text.value = ""
+        run_async(async_add_profile())
+
     async def async_save():
         progress.visible = True
         page.update()
@@ -72,14 +180,7 @@ def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback):
             page.update()
 
     def save_credentials(_):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(async_save())
-        finally:
-            loop.close()
-
-        threading.Thread(target=save_credentials).start()
+        run_async(async_save())
 
     dialog = ft.AlertDialog(
         modal=True,
@@ -128,16 +229,54 @@ def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback):
                         alignment=ft.MainAxisAlignment.CENTER
                     ),
                     alignment=ft.alignment.center
+                ),
+                ft.Divider(),
+                ft.Text("Дополнительные серверы", size=16),
+                profiles_column,
+                ft.Container(
+                    content=profile_name_field,
+                    alignment=ft.alignment.center
+                ),
+                ft.Container(
+                    content=profile_server_field,
+                    alignment=ft.alignment.center
+                ),
+                ft.Container(
+                    content=profile_login_field,
+                    alignment=ft.alignment.center
+                ),
+                ft.Container(
+                    content=profile_password_field,
+                    alignment=ft.alignment.center
+                ),
+                ft.Container(
+                    content=profile_error_text,
+                    alignment=ft.alignment.center
+                ),
+                ft.Container(
+                    content=ft.TextButton(
+                        "Добавить сервер",
+                        icon=ft.icons.ADD,
+                        on_click=add_profile
+                    ),
+                    alignment=ft.alignment.center
                 )
             ],
             spacing=10,
             width=400,
-            height=500
+            height=500,
+            scroll=ft.ScrollMode.AUTO
         )
     )
 
     def open_dialog(_):
+        # Учётные данные могли загрузиться или смениться после создания диалога
+        server_field.value = auth_manager.server
+        login_field.value = auth_manager.login
+        password_field.value = auth_manager.password
+        render_profiles()
         error_text.value = ""
+        profile_error_text.value = ""
         progress.visible = False
         page.overlay.append(dialog)
         dialog.open = True
@@ -146,14 +285,68 @@ def create_settings_dialog(page: ft.Page, auth_manager, on_save_callback):
     return open_dialog
 
 
-def show_snack_bar(page: ft.Page, success: bool):
+def show_snack_bar(page: ft.Page, success: bool, message: str = None):
+    if message is None:
+        message = "Успешно" if success else "Ошибка записи"
     snack = ft.SnackBar(
-        content=ft.Text(
-            "Успешно" if success else "Ошибка записи"
-        ),
+        content=ft.Text(message),
         bgcolor=ft.colors.GREEN_400 if success else ft.colors.RED_400,
         duration=3000
     )
     page.overlay.append(snack)
     snack.open = True
     page.update()
+
+
+def show_push_report(page: ft.Page, report, servers=None, title: str = "Запись отменена"):
+    """Итог записи: какие объекты учёта записаны, по серверам - если их несколько"""
+    written = report.written
+    not_written = len(report.failed)
+    summary = []
+    for name, plan in (servers or {}).items():
+        server_report = getattr(report, "servers", {}).get(name)
+        if plan is None:
+            text = "не удалось получить объекты учёта"
+        elif server_report is None:
+            text = "значения не изменились"
+        else:
+            text = (f"записано {len(server_report.written)}, "
+                    f"не записано {len(server_report.failed)}")
+        summary.append(ft.Text(f"{name}: {text}", size=12))
+    lines = [
+        ft.Text(
+            f"{r.item.src} — объект {r.item.nodeid}: {r.item.tcw}",
+            size=12
+        )
+        for r in written
+    ]
+    dialog = ft.AlertDialog(
+        modal=True,
+        title=ft.Text(title),
+        content=ft.Column(
+            controls=[
+                ft.Text(
+                    f"Записано объектов учёта: {len(written)}, "
+                    f"не записано: {not_written}",
+                    size=14
+                ),
+                *summary,
+                ft.ListView(controls=lines, height=300, spacing=2)
+            ],
+            spacing=10,
+            width=400,
+            tight=True
+        ),
+        actions=[
+            ft.TextButton(
+                "Закрыть",
+                on_click=lambda _: (
+                    setattr(dialog, "open", False),
+                    page.update()
+                )
+            )
+        ]
+    )
+    page.overlay.append(dialog)
+    dialog.open = True
+    page.update()
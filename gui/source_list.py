@@ -0,0 +1,180 @@
+import flet as ft
+from typing import Dict, List
+from config.settings import SOURCES_PAGE_SIZE, SOURCE_ROW_HEIGHT
+from core.merge import normalize_source_name
+from gui.validators import validate_number
+
+
+class SourceList:
+    """Список источников с поиском и постраничным выводом
+
+    Значения хранятся в словаре по названию источника, а на экране живёт
+    только одна страница строк: при листании, поиске и обновлении строки
+    переиспользуются, меняются лишь их текст и значение.
+    """
+
+    def __init__(self, page_size: int = SOURCES_PAGE_SIZE):
+        self.page_size = page_size
+        self.labels: List[str] = []
+        self.values: Dict[str, str] = {}
+        self.filtered: List[str] = []
+        self.offset = 0
+        self._keys: List[str] = []
+        self._rows: List[ft.Row] = []
+
+        self.search_field = ft.TextField(
+            hint_text="Поиск источника",
+            height=35,
+            text_size=14,
+            content_padding=ft.padding.only(left=5, right=5, top=5),
+            prefix_icon=ft.icons.SEARCH,
+            border_color=ft.colors.GREY_300,
+            focused_border_color=ft.colors.BLUE_400,
+            on_change=self.on_search
+        )
+        self.list_view = ft.ListView(
+            item_extent=SOURCE_ROW_HEIGHT,
+            expand=True
+        )
+        self.empty_text = ft.Text(
+            "",
+            size=14,
+            text_align=ft.TextAlign.CENTER,
+            color=ft.colors.GREY_700,
+            width=350
+        )
+        self.prev_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_LEFT,
+            icon_color=ft.colors.BLUE_400,
+            tooltip="Предыдущая страница",
+            on_click=lambda _: self.show_page(self.offset - self.page_size)
+        )
+        self.next_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_RIGHT,
+            icon_color=ft.colors.BLUE_400,
+            tooltip="Следующая страница",
+            on_click=lambda _: self.show_page(self.offset + self.page_size)
+        )
+        self.page_text = ft.Text("", size=12, color=ft.colors.GREY_700)
+        self.empty_box = ft.Container(
+            content=self.empty_text,
+            alignment=ft.alignment.center,
+            padding=ft.padding.only(top=20, bottom=20),
+            visible=False
+        )
+        self.pager = ft.Row(
+            controls=[self.prev_button, self.page_text, self.next_button],
+            alignment=ft.MainAxisAlignment.CENTER,
+            spacing=0,
+            visible=False
+        )
+        self.control = ft.Column(
+            controls=[
+                self.search_field,
+                self.empty_box,
+                self.list_view,
+                self.pager
+            ],
+            spacing=5,
+            expand=True
+        )
+
+    def _make_row(self) -> ft.Row:
+        return ft.Row(
+            controls=[
+                ft.Text("", size=14, width=250),
+                ft.TextField(
+                    width=100,
+                    height=35,
+                    text_align=ft.TextAlign.CENTER,
+                    content_padding=ft.padding.only(left=5, right=5, top=5),
+                    keyboard_type=ft.KeyboardType.NUMBER,
+                    border_color=ft.colors.GREY_300,
+                    focused_border_color=ft.colors.BLUE_400,
+                    on_change=self.on_value_change
+                )
+            ],
+            tight=True
+        )
+
+    def on_value_change(self, event):
+        validate_number(event)
+        label = event.control.data
+        if label is not None:
+            self.values[label] = event.control.value
+
+    def set_labels(self, labels: List[str]):
+        """Новый список источников; введённые значения сохраняются"""
+        self.labels = labels
+        self._keys = [normalize_source_name(label) for label in labels]
+        self.values = {label: self.values.get(label, "") for label in labels}
+        self._apply_filter()
+
+    def set_values(self, values: Dict[str, str]):
+        """Значения по названию источника, например из Excel"""
+        for label, value in values.items():
+            if label in self.values:
+                self.values[label] = value
+        self.render()
+
+    def on_search(self, _):
+        self.offset = 0
+        self._apply_filter()
+        self.control.update()
+
+    def _apply_filter(self):
+        query = normalize_source_name(self.search_field.value or "")
+        if query:
+            self.filtered = [
+                label for label, key in zip(self.labels, self._keys)
+                if query in key
+            ]
+        else:
+            self.filtered = self.labels
+        self.render()
+
+    def show_page(self, offset: int):
+        self.offset = offset
+        self.render()
+        self.control.update()
+
+    def render(self):
+        """Заполнение строк текущей страницы без пересоздания элементов"""
+        last_offset = max(0, (len(self.filtered) - 1) // self.page_size * self.page_size)
+        self.offset = min(max(0, self.offset), last_offset)
+        visible = self.filtered[self.offset:self.offset + self.page_size]
+
+        while len(self._rows) < len(visible):
+            self._rows.append(self._make_row())
+        for row, label in zip(self._rows, visible):
+            text, field = row.controls
+            text.value = label
+            field.data = label
+            field.value = self.values.get(label, "")
+        self.list_view.controls = self._rows[:len(visible)]
+
+        if not self.labels:
+            self.empty_text.value = (
+                "Для работы приложения тебуется пользовательский "
+                "атрибут Объекта Учёта 'sourceName' содержащий "
+                "название источника"
+            )
+        elif not self.filtered:
+            self.empty_text.value = "Источники не найдены"
+        self.empty_box.visible = not self.filtered
+        self.search_field.visible = bool(self.labels)
+
+        self.pager.visible = len(self.filtered) > self.page_size
+        self.prev_button.disabled = self.offset == 0
+        self.next_button.disabled = self.offset + self.page_size >= len(self.filtered)
+        if visible:
+            self.page_text.value = (
+                f"{self.offset + 1}–{self.offset + len(visible)} из {len(self.filtered)}")
+
+    def grab_data(self) -> List[List[str]]:
+        """Пары [источник, значение] для всех источников, а не только видимых"""
+        return [
+            [label, self.values[label].replace(",", ".")]
+            for label in self.labels
+            if self.values.get(label)
+        ]
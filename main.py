@@ -1,15 +1,27 @@
-import flet as ft
-from gui.app import TcwImportApp
+from utils import metrics, startup
+startup.install()
+metrics.install()
+
+import flet as ft  # noqa: E402
+
+startup.mark("flet загружен")
 
 
 async def main(page: ft.Page):
+    # Модули приложения загружаются, пока запускается окно Flet
+    from gui.app import TcwImportApp
+    startup.mark("модули приложения загружены")
+
     app = TcwImportApp()
+
+    async def on_disconnect(_):
+        await app.cleanup()
+
+    page.on_disconnect = on_disconnect
     try:
         await app.main(page)
     except Exception as e:
         print(f"Error: {e}")
-    finally:
-        await app.cleanup()
 
 if __name__ == "__main__":
     ft.app(target=main, assets_dir="icons")
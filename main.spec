@@ -2,7 +2,7 @@
 
 block_cipher = None
 
-a = Analysis(['gui/app.py'],
+a = Analysis(['main.py'],
              pathex=['D:/proj/bin/TcwImport'],
              binaries=[],
              datas=[],
@@ -0,0 +1,37 @@
+import json
+import pytest
+from utils.json_stream import JsonArrayStream
+
+
+def parse(data: bytes, chunk: int):
+    parser = JsonArrayStream("nodes")
+    items = []
+    for start in range(0, len(data), chunk):
+        items.extend(parser.feed(data[start:start + chunk]))
+    parser.close()
+    return items
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 64, 4096])
+def test_items_split_across_chunks(chunk):
+    nodes = [
+        {"id": i, "title": f"Котельная №{i}", "temp": i + 0.25, "attributes": [{"code": "x"}]}
+        for i in range(20)
+    ]
+    data = json.dumps({"total": 20, "nodes": nodes, "tail": [1, 2]}, ensure_ascii=False).encode()
+
+    assert parse(data, chunk) == nodes
+
+
+def test_numbers_are_not_cut_at_chunk_boundary():
+    data = b'{"nodes": [1, 12.5, -3e2]}'
+
+    assert parse(data, 1) == [1, 12.5, -300.0]
+
+
+def test_incomplete_document_raises():
+    parser = JsonArrayStream("nodes")
+    parser.feed(b'{"nodes": [{"id": 1}')
+
+    with pytest.raises(ValueError):
+        parser.close()
@@ -0,0 +1,62 @@
+from core.model import PushItem
+from core.outbox import PushOutbox
+
+SERVER = "http://lers.local"
+
+
+def values(outbox, server=SERVER):
+    return {item.nodeid: item.tcw for item in outbox.pending(server)}
+
+
+def test_last_value_wins(tmp_path):
+    outbox = PushOutbox(str(tmp_path / "outbox.json"))
+    outbox.put(SERVER, [PushItem(1, 9.0, "a"), PushItem(2, 4.0, "b")])
+    outbox.put(SERVER, [PushItem(1, 5.0, "a")])
+
+    assert values(outbox) == {1: 5.0, 2: 4.0}
+
+
+def test_discard_keeps_newer_value(tmp_path):
+    outbox = PushOutbox(str(tmp_path / "outbox.json"))
+    outbox.put(SERVER, [PushItem(1, 9.0, "a"), PushItem(2, 4.0, "b")])
+    # Отправлено старое значение, в очереди уже новое
+    outbox.put(SERVER, [PushItem(1, 5.0, "a")])
+    outbox.discard(SERVER, [PushItem(1, 9.0, "a"), PushItem(2, 4.0, "b")])
+
+    assert values(outbox) == {1: 5.0}
+
+    outbox.discard(SERVER, [PushItem(1, 7.0, "a")], any_value=True)
+    assert values(outbox) == {}
+
+
+def test_reload_from_disk(tmp_path):
+    path = str(tmp_path / "outbox.json")
+    outbox = PushOutbox(path)
+    outbox.put(SERVER, [PushItem(1, 9.0, "a"), PushItem(2, 4.0, "b"), PushItem(3, 3.0, "c")])
+    outbox.put(SERVER, [PushItem(1, 5.0, "a")])
+    outbox.discard(SERVER, [PushItem(2, 4.0, "b")])
+
+    reloaded = PushOutbox(path)
+    assert values(reloaded) == {1: 5.0, 3: 3.0}
+    assert values(reloaded, "http://other") == {}
+
+
+def test_empty_outbox_removes_file(tmp_path):
+    path = tmp_path / "outbox.json"
+    outbox = PushOutbox(str(path))
+    outbox.put(SERVER, [PushItem(1, 9.0, "a")])
+    assert path.exists()
+
+    outbox.discard(SERVER, [PushItem(1, 9.0, "a")])
+    assert not path.exists()
+    assert values(PushOutbox(str(path))) == {}
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    path = tmp_path / "outbox.json"
+    outbox = PushOutbox(str(path))
+    outbox.put(SERVER, [PushItem(1, 9.0, "a"), PushItem(2, 4.0, "b")])
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('[3, 2.')
+
+    assert values(PushOutbox(str(path))) == {1: 9.0, 2: 4.0}
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from core.model import PushItem
+from core.push import AdaptiveLimiter, PushEngine, PushItemResult, RetryPolicy
+
+
+def make_items(count):
+    return [PushItem(i, 5.0, f"Котельная {i}") for i in range(count)]
+
+
+def fast_retry():
+    return RetryPolicy(base_delay=0.01, max_delay=0.01)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_dropped_connection_is_retried():
+    dropped = set()
+
+    async def send(batch):
+        results = []
+        for item in batch:
+            if item.nodeid == 3 and item.nodeid not in dropped:
+                dropped.add(item.nodeid)
+                results.append(PushItemResult(item, False, error="Server disconnected"))
+            else:
+                results.append(PushItemResult(item, True, status=200))
+        return results
+
+    engine = PushEngine(send, retry_policy=fast_retry(), batch_size=10)
+    report = run(engine.run(make_items(200)))
+
+    assert len(report.written) == 200
+    assert not engine.unreachable
+    retried = next(r for r in report.results if r.item.nodeid == 3)
+    assert retried.attempts == 2
+
+
+def test_refused_connection_stops_push():
+    calls = []
+
+    async def send(batch):
+        calls.append(batch)
+        return [PushItemResult(item, False, error="refused", connect_failed=True) for item in batch]
+
+    engine = PushEngine(send, retry_policy=fast_retry(), max_workers=1)
+    report = run(engine.run(make_items(50)))
+
+    assert engine.unreachable
+    assert len(calls) == 1
+    assert len(report.failed) == 50
+    assert all(r.transient for r in report.failed)
+
+
+def test_repeated_silence_stops_push():
+    async def send(batch):
+        return [PushItemResult(item, False, error="timeout") for item in batch]
+
+    engine = PushEngine(send, retry_policy=fast_retry(), unreachable_attempts=3)
+    report = run(engine.run(make_items(50)))
+
+    assert engine.unreachable
+    assert max(r.attempts for r in report.results) == 3
+    assert {r.error for r in report.failed} <= {"timeout", "server unreachable"}
+
+
+def test_cancel_during_retry_keeps_written():
+    accepted = set()
+
+    async def send(batch):
+        results = []
+        for item in batch:
+            if item.nodeid == 0:
+                results.append(PushItemResult(item, False, status=503))
+            else:
+                accepted.add(item.nodeid)
+                results.append(PushItemResult(item, True, status=200))
+        return results
+
+    marked = []
+
+    async def scenario():
+        engine = PushEngine(
+            send,
+            retry_policy=RetryPolicy(base_delay=10, max_delay=10),
+            batch_size=10,
+            on_result=lambda r: marked.append(r.item.nodeid) if r.success else None
+        )
+        task = asyncio.create_task(engine.run(make_items(10)))
+        await asyncio.sleep(0.1)
+        engine.cancel()
+        return await task
+
+    report = run(scenario())
+
+    assert report.cancelled
+    assert {r.item.nodeid for r in report.written} == accepted
+    assert sorted(marked) == sorted(accepted)
+    assert [r.error for r in report.failed] == ["cancelled"]
+
+
+def test_retry_after_pauses_pool():
+    throttled = set()
+
+    async def send(batch):
+        results = []
+        for item in batch:
+            if item.nodeid not in throttled:
+                throttled.add(item.nodeid)
+                results.append(PushItemResult(item, False, status=429, retry_after=0.3))
+            else:
+                results.append(PushItemResult(item, True, status=200))
+        return results
+
+    engine = PushEngine(send, retry_policy=fast_retry())
+    started = time.monotonic()
+    report = run(engine.run(make_items(1)))
+
+    assert report
+    assert time.monotonic() - started >= 0.3
+    assert report.results[0].attempts == 2
+
+
+def test_bare_503_does_not_pause_pool():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=4)
+        await limiter.acquire()
+        await limiter.release(PushItemResult(make_items(1)[0], False, status=503))
+        started = time.monotonic()
+        await limiter.acquire()
+        return limiter, time.monotonic() - started
+
+    limiter, waited = run(scenario())
+
+    assert waited < 0.1
+    assert limiter.window == 2
@@ -1,15 +1,29 @@
-from typing import List, Dict, Any
-import pandas as pd
+import itertools
+import os
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SOURCE_COLUMN = 'Источник'
+TEMPERATURE_COLUMN = 'Температура'
+REQUIRED_COLUMNS = [SOURCE_COLUMN, TEMPERATURE_COLUMN]
+TEMPERATURE_MIN = -99.99
+TEMPERATURE_MAX = 99.99
+CHUNK_ROWS = 10_000  # строк CSV и Parquet за одно чтение
+CSV_EXTENSIONS = ('.csv', '.txt')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def _is_missing(value: Any) -> bool:
+    """Пустая ячейка: None или NaN"""
+    return value is None or (isinstance(value, float) and value != value)
 
 
 def export_to_excel(data: List[dict], filepath: str) -> str:
-    df = pd.DataFrame(data)
+    import xlsxwriter
 
-    with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Данные')
+    columns = list(data[0].keys()) if data else []
 
-        worksheet = writer.sheets['Данные']
-        workbook = writer.book
+    with xlsxwriter.Workbook(filepath) as workbook:
+        worksheet = workbook.add_worksheet('Данные')
 
         header_format = workbook.add_format({
             'bold': True,
@@ -32,16 +46,18 @@ def export_to_excel(data: List[dict], filepath: str) -> str:
             'num_format': '0.00'
         })
 
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
+        worksheet.write_row(0, 0, columns, header_format)
 
-        for row_num in range(len(df)):
-            worksheet.write(row_num + 1, 0, df.iloc[row_num, 0], data_format)
-            temp_value = df.iloc[row_num, 1]
-            if pd.isna(temp_value):
-                worksheet.write(row_num + 1, 1, '', data_format)
-            else:
-                worksheet.write(row_num + 1, 1, temp_value, number_format)
+        # Данные пишутся столбцами, пустые значения - ячейками с рамкой
+        for col_num, column in enumerate(columns):
+            values = [
+                None if _is_missing(row.get(column)) else row.get(column)
+                for row in data
+            ]
+            worksheet.write_column(
+                1, col_num, values,
+                data_format if col_num == 0 else number_format
+            )
 
         worksheet.set_column(0, 0, 30)
         worksheet.set_column(1, 1, 15)
@@ -49,26 +65,173 @@ def export_to_excel(data: List[dict], filepath: str) -> str:
     return filepath
 
 
-def import_from_excel(filename: str) -> List[Dict[str, Any]]:
+def _temperature(value: Any) -> Optional[float]:
+    """Значение Тхв из ячейки или None, если оно не число или вне диапазона"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
     try:
-        df = pd.read_excel(filename)
+        tcw = float(value)
+    except (TypeError, ValueError):
+        return None
+    return tcw if TEMPERATURE_MIN <= tcw <= TEMPERATURE_MAX else None
+
+
+def _records(pairs: Iterable[Tuple[Any, Any]]) -> Iterator[Dict[str, Any]]:
+    """Проверенные записи {'src', 'tcw'}; строки без источника пропускаются"""
+    for src, value in pairs:
+        if _is_missing(src) or src == '':
+            continue
+        tcw = _temperature(value)
+        if tcw is not None:
+            yield {'src': src, 'tcw': tcw}
 
-        required_columns = ['Источник', 'Температура']
-        if not all(col in df.columns for col in required_columns):
-            raise ValueError("Неверный формат файла Excel")
 
-        data = []
-        for _, row in df.iterrows():
+def _column_indexes(header: Iterable[Any]) -> Tuple[int, int]:
+    names = [str(name).strip() if name is not None else '' for name in header]
+    if not all(column in names for column in REQUIRED_COLUMNS):
+        raise ValueError("Неверный формат файла Excel")
+    return names.index(SOURCE_COLUMN), names.index(TEMPERATURE_COLUMN)
+
+
+def _open_xlsx(filename: str) -> Iterator[Tuple[Any, Any]]:
+    from openpyxl import load_workbook
+
+    # read_only разбирает лист по мере чтения, не загружая книгу целиком
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        # Данные берутся с первого листа, где есть нужные столбцы
+        for worksheet in workbook.worksheets:
+            header = next(worksheet.iter_rows(max_row=1, values_only=True), None)
             try:
-                temp = float(row['Температура'])
-                if -99.99 <= temp <= 99.99:
-                    data.append({
-                        'src': row['Источник'],
-                        'tcw': temp
-                    })
-            except (ValueError, TypeError):
+                src_index, tcw_index = _column_indexes(header or ())
+            except ValueError:
                 continue
+            first = min(src_index, tcw_index)
+            last = max(src_index, tcw_index)
+            src_index -= first
+            tcw_index -= first
+            break
+        else:
+            raise ValueError("Неверный формат файла Excel")
+    except Exception:
+        workbook.close()
+        raise
+
+    def rows() -> Iterator[Tuple[Any, Any]]:
+        try:
+            # Разбираются только ячейки между двумя нужными столбцами
+            for row in worksheet.iter_rows(
+                min_row=2,
+                min_col=first + 1,
+                max_col=last + 1,
+                values_only=True
+            ):
+                if len(row) > max(src_index, tcw_index):
+                    yield row[src_index], row[tcw_index]
+        finally:
+            workbook.close()
+
+    return rows()
+
+
+def _csv_options(filename: str) -> Dict[str, str]:
+    """Кодировка и разделитель по началу файла"""
+    with open(filename, 'rb') as file:
+        head = file.read(64 * 1024)
+    try:
+        text = head.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:
+            # Выгрузки из русской Windows
+            return _csv_separator(head.decode('cp1251'), 'cp1251')
+        # Начало файла оборвалось посреди символа UTF-8
+        text = head[:e.start].decode('utf-8-sig')
+    return _csv_separator(text, 'utf-8-sig')
+
+
+def _csv_separator(text: str, encoding: str) -> Dict[str, str]:
+    header = text.splitlines()[0] if text else ''
+    return {'encoding': encoding, 'sep': max(';,\t', key=header.count)}
+
+
+def _open_csv(filename: str) -> Iterator[Tuple[Any, Any]]:
+    # pandas загружается только для CSV: пакетному режиму с .xlsx он не нужен
+    import pandas as pd
+
+    reader = pd.read_csv(
+        filename,
+        usecols=lambda column: column.strip() in REQUIRED_COLUMNS,
+        dtype=str,
+        chunksize=CHUNK_ROWS,
+        **_csv_options(filename)
+    )
+    first = next(reader, None)
+    if first is None or not all(
+            column in first.rename(columns=str.strip).columns for column in REQUIRED_COLUMNS):
+        reader.close()
+        raise ValueError("Неверный формат файла CSV")
+
+    def rows() -> Iterator[Tuple[Any, Any]]:
+        with reader:
+            for chunk in itertools.chain([first], reader):
+                chunk = chunk.rename(columns=str.strip)
+                yield from zip(
+                    chunk[SOURCE_COLUMN].tolist(),
+                    chunk[TEMPERATURE_COLUMN].tolist()
+                )
+
+    return rows()
+
+
+def _open_parquet(filename: str) -> Iterator[Tuple[Any, Any]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Для чтения Parquet требуется пакет pyarrow")
 
-        return data
+    parquet = pq.ParquetFile(filename)
+    if not all(column in parquet.schema_arrow.names for column in REQUIRED_COLUMNS):
+        raise ValueError("Неверный формат файла Parquet")
+
+    def rows() -> Iterator[Tuple[Any, Any]]:
+        for batch in parquet.iter_batches(batch_size=CHUNK_ROWS, columns=REQUIRED_COLUMNS):
+            columns = batch.to_pydict()
+            yield from zip(columns[SOURCE_COLUMN], columns[TEMPERATURE_COLUMN])
+
+    return rows()
+
+
+def _opener(filename: str) -> Callable[[str], Iterator[Tuple[Any, Any]]]:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CSV_EXTENSIONS:
+        return _open_csv
+    if extension in PARQUET_EXTENSIONS:
+        return _open_parquet
+    return _open_xlsx
+
+
+def read_records(filename: str) -> Iterator[Dict[str, Any]]:
+    """Записи {'src', 'tcw'} из .xlsx, .csv или .parquet по мере чтения файла
+
+    Файл открывается и проверяется сразу, а строки читаются порциями при
+    обходе: в памяти не бывает больше одной порции, и сопоставление может
+    начаться до конца чтения. Ошибки - ValueError, как у import_from_excel.
+    """
+    try:
+        pairs = _opener(filename)(filename)
     except Exception as e:
         raise ValueError(f"Ошибка при импорте данных: {str(e)}")
+
+    def records() -> Iterator[Dict[str, Any]]:
+        try:
+            yield from _records(pairs)
+        except Exception as e:
+            raise ValueError(f"Ошибка при импорте данных: {str(e)}")
+
+    return records()
+
+
+def import_from_excel(filename: str) -> List[Dict[str, Any]]:
+    return list(read_records(filename))
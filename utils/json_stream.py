@@ -0,0 +1,118 @@
+import codecs
+import json
+from typing import Any, Iterator, List
+
+
+class JsonArrayStream:
+    """Потоковый разбор элементов массива key из JSON-объекта верхнего уровня
+
+    Данные подаются кусками через feed(), разобранные элементы массива
+    отдаются сразу и не накапливаются: в памяти остаётся только
+    недочитанный хвост буфера.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Добавление куска данных, возвращает готовые элементы массива"""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        return list(self._parse())
+
+    def close(self):
+        """Проверка, что документ дочитан до конца"""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b"", final=True)
+        self._pos = 0
+        list(self._parse())
+        if self._state != "done":
+            raise ValueError(f"Неполный JSON-документ: {self._state}")
+
+    def _skip_ws(self) -> bool:
+        """Пропуск пробелов, False - если буфер закончился"""
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode(self):
+        """Разбор одного значения; None - если данных пока недостаточно"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            return None
+        # Число может продолжиться в следующем куске ("1" -> "1.5")
+        if self._buffer[self._pos] not in '{["' and (
+                end == len(self._buffer) or self._buffer[end] not in " \t\r\n,]}"):
+            return None
+        return value, end
+
+    def _parse(self) -> Iterator[Any]:
+        while self._state != "done" and self._skip_ws():
+            char = self._buffer[self._pos]
+
+            if self._state == "start":
+                if char != "{":
+                    raise ValueError("Ожидался JSON-объект")
+                self._pos += 1
+                self._state = "key"
+
+            elif self._state == "key":
+                if char == ",":
+                    self._pos += 1
+                    continue
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                start = self._pos
+                decoded = self._decode()
+                if decoded is None:
+                    return
+                key, self._pos = decoded
+                if not self._skip_ws():
+                    self._pos = start
+                    return
+                if self._buffer[self._pos] != ":":
+                    raise ValueError("Ожидалось ':' после ключа")
+                self._pos += 1
+                self._state = "array" if key == self.key else "value"
+
+            elif self._state == "value":
+                decoded = self._decode()
+                if decoded is None:
+                    return
+                self._pos = decoded[1]
+                self._state = "key"
+
+            elif self._state == "array":
+                if char == "[":
+                    self._pos += 1
+                    self._state = "items"
+                elif char == "n" and self._buffer.startswith("null", self._pos):
+                    self._pos += 4
+                    self._state = "key"
+                elif char == "n" and len(self._buffer) - self._pos < 4:
+                    return
+                else:
+                    raise ValueError(f"Ожидался массив '{self.key}'")
+
+            elif self._state == "items":
+                if char == ",":
+                    self._pos += 1
+                    continue
+                if char == "]":
+                    self._pos += 1
+                    self._state = "key"
+                    continue
+                decoded = self._decode()
+                if decoded is None:
+                    return
+                item, self._pos = decoded
+                yield item
@@ -0,0 +1,212 @@
+"""Замеры времени этапов обмена с сервером
+
+Включается переменной окружения TCWIMPORT_METRICS=<файл> или ключом
+--metrics <файл>: каждый замер (вход, загрузка и разбор объектов учёта,
+сопоставление, каждый PATCH, DNS и установка соединения) дописывается
+в файл строкой JSON. Ключ --timings или TCWIMPORT_TIMINGS=1 выводит
+в stderr сводную таблицу при завершении. Без них замеры ничего не стоят.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+METRICS_ENV = "TCWIMPORT_METRICS"
+METRICS_FLAG = "--metrics"
+TIMINGS_ENV = "TCWIMPORT_TIMINGS"
+TIMINGS_FLAG = "--timings"
+
+class MetricsRecorder:
+    """Журнал замеров и сводка по ним"""
+
+    def __init__(self, path: Optional[str] = None, summary: bool = False):
+        self.path = path
+        self.summary = summary
+        self.durations: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        # Замеры приходят и из фонового цикла событий, и из потока окна
+        self._lock = threading.Lock()
+        self._file = None
+        self._finished = False
+
+    def record(self, name: str, duration: float, **fields: Any):
+        error = fields.get("error")
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration)
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            if self.path:
+                self._write({
+                    "ts": round(time.time(), 3),
+                    "span": name,
+                    "ms": round(duration * 1000, 3),
+                    **fields
+                })
+
+    def _write(self, entry: Dict[str, Any]):
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            self.path = None
+
+    @contextmanager
+    def span(self, name: str, **fields: Any):
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, **fields)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        with self._lock:
+            for name, values in self.durations.items():
+                values = sorted(values)
+                result[name] = {
+                    "count": len(values),
+                    "errors": self.errors.get(name, 0),
+                    "total_ms": sum(values) * 1000,
+                    "mean_ms": sum(values) / len(values) * 1000,
+                    "p50_ms": _percentile(values, 0.50) * 1000,
+                    "p99_ms": _percentile(values, 0.99) * 1000,
+                    "max_ms": values[-1] * 1000
+                }
+        return result
+
+    def report(self) -> str:
+        lines = [
+            f"{'этап':<22} {'число':>7} {'ошибок':>7} {'всего, мс':>11} "
+            f"{'среднее':>9} {'p50':>9} {'p99':>9} {'макс.':>9}"
+        ]
+        for name, row in self.stats().items():
+            lines.append(
+                f"{name:<22} {row['count']:>7} {row['errors']:>7} {row['total_ms']:>11.1f} "
+                f"{row['mean_ms']:>9.1f} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+                f"{row['max_ms']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def finish(self):
+        """Сводка в конец журнала и, если запрошено, таблица в stderr"""
+        if self._finished:
+            return
+        self._finished = True
+        stats = self.stats()
+        with self._lock:
+            if self.path:
+                self._write({"ts": round(time.time(), 3), "summary": stats})
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass
+                self._file = None
+        if self.summary and stats:
+            print(self.report(), file=sys.stderr)
+
+
+def _percentile(values: List[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+_recorder: Optional[MetricsRecorder] = None
+
+
+def install(
+    path: Optional[str] = None,
+    summary: bool = False,
+    argv: Optional[List[str]] = None
+) -> bool:
+    """Включение замеров, если они запрошены аргументами или окружением"""
+    global _recorder
+    argv = sys.argv if argv is None else argv
+    if path is None:
+        path = os.environ.get(METRICS_ENV)
+        if METRICS_FLAG in argv[:-1]:
+            path = argv[argv.index(METRICS_FLAG) + 1]
+    summary = summary or bool(os.environ.get(TIMINGS_ENV)) or TIMINGS_FLAG in argv
+    if not (path or summary):
+        return False
+    if _recorder is None:
+        _recorder = MetricsRecorder(path, summary)
+        atexit.register(finish)
+    return True
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def span(name: str, **fields: Any):
+    """Замер блока with; в поля можно дописать результат по ходу блока"""
+    if _recorder is None:
+        return nullcontext({})
+    return _recorder.span(name, **fields)
+
+
+def record(name: str, duration: float, **fields: Any):
+    if _recorder is not None:
+        _recorder.record(name, duration, **fields)
+
+
+def finish():
+    if _recorder is not None:
+        _recorder.finish()
+
+
+def trace_configs() -> list:
+    """TraceConfig aiohttp для замеров DNS, соединения и ответа сервера"""
+    if _recorder is None:
+        return []
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        record(
+            "http.request",
+            time.perf_counter() - context.started,
+            method=params.method,
+            status=params.response.status
+        )
+
+    async def on_request_exception(session, context, params):
+        record(
+            "http.request",
+            time.perf_counter() - context.started,
+            method=params.method,
+            error=type(params.exception).__name__
+        )
+
+    async def on_dns_start(session, context, params):
+        context.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        record("http.dns", time.perf_counter() - context.dns_started, host=params.host)
+
+    async def on_connection_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_end(session, context, params):
+        # TCP и TLS: отдельного события рукопожатия TLS в aiohttp нет
+        record("http.connect", time.perf_counter() - context.connect_started)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connection_start)
+    config.on_connection_create_end.append(on_connection_end)
+    return [config]
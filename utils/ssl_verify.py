@@ -1,10 +1,10 @@
 import ssl
 import certifi
-import requests
 from urllib.parse import urlparse
 
 
 def verify_ssl_cert(url: str) -> tuple[bool, str]:
+    import requests
     try:
         parsed_url = urlparse(url)
         if parsed_url.scheme != 'https':
@@ -0,0 +1,112 @@
+"""Профилирование холодного старта в духе python -X importtime
+
+Включается переменной окружения TCWIMPORT_PROFILE_STARTUP=1 или ключом
+--profile-startup и работает в том числе в сборке PyInstaller, где флаги
+интерпретатора недоступны. Отчёт пишется в STARTUP_REPORT_FILE.
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config.settings import STARTUP_REPORT_FILE, STARTUP_REPORT_TOP
+
+PROFILE_ENV = "TCWIMPORT_PROFILE_STARTUP"
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Время импорта модулей и этапов запуска приложения"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, Tuple[float, float]] = {}
+        # Импорты идут и из фонового цикла событий, стек у каждого потока свой
+        self._local = threading.local()
+        self._original_import = builtins.__import__
+        self._installed = False
+        self._reported = False
+
+    def install(self):
+        if not self._installed:
+            builtins.__import__ = self._import
+            self._installed = True
+
+    def uninstall(self):
+        if self._installed:
+            builtins.__import__ = self._original_import
+            self._installed = False
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Уже загруженные модули не измеряем
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            if name not in self.imports:
+                self.imports[name] = (elapsed - children, elapsed)
+
+    def mark(self, phase: str):
+        self.phases.append((phase, time.perf_counter() - self.started))
+
+    def report(self) -> str:
+        lines = ["Этапы запуска:"]
+        for phase, elapsed in self.phases:
+            lines.append(f"  {elapsed * 1000:>9.1f} мс  {phase}")
+
+        lines.append("")
+        lines.append(f"Самые долгие импорты (top {STARTUP_REPORT_TOP}):")
+        lines.append(f"  {'своё, мс':>9} | {'всего, мс':>9} | модуль")
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (own, total) in ranked[:STARTUP_REPORT_TOP]:
+            lines.append(f"  {own * 1000:>9.1f} | {total * 1000:>9.1f} | {name}")
+        return "\n".join(lines)
+
+    def write_report(self, path: str = STARTUP_REPORT_FILE):
+        """Однократная запись отчёта, когда приложение готово к работе"""
+        if self._reported:
+            return
+        self._reported = True
+        self.uninstall()
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.report())
+        except OSError:
+            pass
+
+
+_profiler: Optional[StartupProfiler] = None
+
+
+def install(argv: Optional[List[str]] = None) -> bool:
+    """Включение профилирования, если оно запрошено"""
+    global _profiler
+    argv = sys.argv if argv is None else argv
+    if not (os.environ.get(PROFILE_ENV) or PROFILE_FLAG in argv):
+        return False
+    if _profiler is None:
+        _profiler = StartupProfiler()
+        _profiler.install()
+    return True
+
+
+def mark(phase: str):
+    if _profiler is not None:
+        _profiler.mark(phase)
+
+
+def finish(phase: str = "готово"):
+    if _profiler is not None:
+        _profiler.mark(phase)
+        _profiler.write_report()